@@ -12,4 +12,14 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from .schematic import Schematic, load_license
+from .schematic import Schematic, Checkpoint, load_license
+from .sweep import SweepResult
+from .cache import ResultCache
+from .store import TraceStore, load_data
+from .pool import SchematicPool
+from .aio import AsyncSchematic
+from .cosim import CoSimulation
+from .profiling import Profiler
+from .reader import SchematicIndex, read_schematic
+from .montecarlo import MonteCarloResult
+from .search import BoundaryResult, BoundaryMap
@@ -0,0 +1,119 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import time
+import asyncio
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .nl5_dll import commands as nl5
+from .schematic import Schematic
+
+
+class AsyncSchematic:
+    # a schematic whose DLL calls all run on its own worker thread, so they
+    # never block the event loop and never overlap on the same circuit, which
+    # is opened on that thread by open() or async with
+    def __init__(self, filename, cache=None):
+        self.filename = filename
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.schematic = None
+
+    async def open(self):
+        if self.schematic is None:
+            self.schematic = await self._run(Schematic, self.filename, self.cache)
+        return self
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        # any other Schematic method becomes a coroutine run on the worker
+        if name == "schematic":
+            raise AttributeError(name)
+        if self.schematic is None:
+            raise AttributeError(f"{name} needs the schematic to be opened first")
+        attr = getattr(self.schematic, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self._run(attr, *args, **kwargs)
+
+        return method
+
+    @property
+    def simulation_time(self):
+        # read directly, since the worker is busy while a simulation runs
+        return self.schematic.get_simulation_time()
+
+    def _start(self, step):
+        schematic = self.schematic
+        schematic._call(nl5.NL5_SetStep, schematic.circuit, step)
+        schematic._call(nl5.NL5_Start, schematic.circuit)
+
+    def _simulate_chunk(self, interval):
+        schematic = self.schematic
+        schematic._check(nl5.NL5_SimulateInterval(schematic.circuit, interval))
+        return schematic.get_simulation_time()
+
+    async def simulate_transient(
+        self, screen, step, chunk=None, progress=None, timeout=None
+    ):
+        # simulated in chunks of NL5_SimulateInterval, so cancelling the task
+        # or running past the timeout stops it at the next chunk boundary,
+        # while NL5_SetTimeout also bounds a single chunk in the DLL, and is
+        # put back as it was afterwards
+        if chunk is None:
+            chunk = screen / 20
+        if timeout is None:
+            return await self._simulate(screen, step, chunk, progress, None)
+
+        previous = self.schematic._timeout
+        await self._run(self.schematic.set_timeout, timeout)
+        try:
+            await self._simulate(screen, step, chunk, progress, timeout)
+        finally:
+            await self._run(self.schematic.set_timeout, previous)
+
+    async def _simulate(self, screen, step, chunk, progress, timeout):
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        await self._run(self._start, step)
+
+        num_chunks = int(np.ceil(screen / chunk - 1e-9))
+        for i in range(num_chunks):
+            if timeout is not None and time.monotonic() > deadline:
+                raise asyncio.TimeoutError(f"simulation timed out after {timeout} s")
+
+            t = await self._run(self._simulate_chunk, min(chunk, screen - i * chunk))
+            if progress is not None:
+                progress(t, screen)
+
+    async def close(self):
+        if self.schematic is not None:
+            await self._run(self.schematic.close)
+        self._executor.shutdown()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *args):
+        await self.close()
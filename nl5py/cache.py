@@ -0,0 +1,131 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+# bump whenever the stored layout or the key contents change
+CACHE_VERSION = 1
+
+
+def _summarize(value):
+    # arrays are keyed by a digest of their contents, since their repr leaves
+    # out all but the first and last few elements
+    if isinstance(value, np.ndarray):
+        contents = np.ascontiguousarray(value).tobytes()
+        return (
+            "ndarray",
+            value.dtype.str,
+            value.shape,
+            hashlib.sha256(contents).hexdigest(),
+        )
+    if isinstance(value, (list, tuple)):
+        return type(value)(_summarize(item) for item in value)
+    return value
+
+
+class ResultCache:
+    # simulation results stored as uncompressed .npz files, one per key, and
+    # evicted least recently used first once the directory exceeds max_size
+    def __init__(self, directory, max_size=2**30):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+        # file digests by path, reused while the file is unchanged on disk
+        self._digests = {}
+
+    def file_digest(self, filename):
+        stat = os.stat(filename)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._digests.get(filename)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with open(filename, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._digests[filename] = (signature, digest)
+        return digest
+
+    def key(self, filename, changes, settings):
+        # repr is exact for floats, so equal inputs always give the same key
+        content = repr(
+            (
+                CACHE_VERSION,
+                self.file_digest(filename),
+                _summarize(changes),
+                _summarize(settings),
+            )
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+
+        # mark it as recently used
+        os.utime(path)
+        return arrays
+
+    def put(self, key, **arrays):
+        # write to a temporary file first, so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, self._path(key))
+
+        self.evict()
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, name in self.entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,105 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import ctypes as ct
+from .nl5_dll import commands as nl5
+from .nl5_dll.commands import nl5_call, nl5_error
+
+
+class CoSimulation:
+    # steps a circuit one simulation step at a time, setting its inputs and
+    # reading its outputs around each step, with every handle resolved and
+    # every DLL function looked up once up front
+    def __init__(self, schematic, inputs, outputs):
+        self.schematic = schematic
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+        self._inputs = [schematic.get_input(name) for name in self.inputs]
+        self._outputs = [
+            (schematic.get_output(name), ct.c_double()) for name in self.outputs
+        ]
+        self._t = ct.c_double()
+
+    def start(self, step):
+        schematic = self.schematic
+        schematic._call(nl5.NL5_SetStep, schematic.circuit, step)
+        schematic._call(nl5.NL5_Start, schematic.circuit)
+
+    def set_inputs(self, values):
+        schematic = self.schematic
+        circuit = schematic.circuit
+        set_value = nl5.NL5_SetInputValue
+        set_logical_value = nl5.NL5_SetInputLogicalValue
+        for handle, value in zip(self._inputs, values):
+            if isinstance(value, bool):
+                code, error = nl5_call(set_logical_value, circuit, handle, value)
+            else:
+                code, error = nl5_call(set_value, circuit, handle, value)
+            if code < 0:
+                schematic._check(code, error)
+
+    def get_outputs(self):
+        schematic = self.schematic
+        circuit = schematic.circuit
+        get_value = nl5.NL5_GetOutputValue
+        values = []
+        for handle, value in self._outputs:
+            code, error = nl5_call(get_value, circuit, handle, value)
+            if code < 0:
+                schematic._check(code, error)
+            values.append(value.value)
+        return values
+
+    @property
+    def time(self):
+        schematic = self.schematic
+        schematic._call(nl5.NL5_GetSimulationTime, schematic.circuit, self._t)
+        return self._t.value
+
+    def step(self, values=None):
+        # optionally set the inputs, then simulate one step and read outputs
+        if values is not None:
+            self.set_inputs(values)
+
+        code = nl5.NL5_SimulateStep(self.schematic.circuit)
+        if code < 0:
+            raise nl5_error(code)
+        return self.get_outputs()
+
+    def run(self, controller, t_end):
+        # controller(t, outputs) returns the new input values, or None to keep
+        # the current ones, and is called before every step until t_end
+        schematic = self.schematic
+        circuit = schematic.circuit
+        simulate_step = nl5.NL5_SimulateStep
+        get_time = nl5.NL5_GetSimulationTime
+        t = self._t
+
+        steps = 0
+        schematic._call(get_time, circuit, t)
+        while t.value < t_end:
+            values = controller(t.value, self.get_outputs())
+            if values is not None:
+                self.set_inputs(values)
+
+            # raised even in a batch, which would otherwise keep stepping a
+            # failed simulation forever
+            code = simulate_step(circuit)
+            if code < 0:
+                raise nl5_error(code)
+            get_time(circuit, t)
+            steps += 1
+
+        return steps
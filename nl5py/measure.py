@@ -0,0 +1,211 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import numpy as np
+
+# Each metric accumulates the samples of a trace one chunk at a time, through
+# update(t, v) with NumPy arrays, and holds as little of them as it can.
+
+
+class Extremes:
+    def __init__(self, metric):
+        self.metric = metric
+        self.max = -np.inf
+        self.min = np.inf
+
+    def update(self, t, v):
+        if len(v):
+            self.max = max(self.max, v.max())
+            self.min = min(self.min, v.min())
+
+    def value(self):
+        if self.min > self.max:
+            return np.nan
+        return {
+            "max": self.max,
+            "min": self.min,
+            "pk2pk": self.max - self.min,
+        }[self.metric]
+
+
+class Integral:
+    # time-weighted average or RMS, integrated with the trapezoidal rule and
+    # joined across chunks through the last sample of the previous one
+    def __init__(self, metric):
+        self.metric = metric
+        self.integral = 0.0
+        self.start = None
+        self.last = None
+
+    def update(self, t, v):
+        if not len(t):
+            return
+        if self.metric == "rms":
+            v = v * v
+
+        if self.last is not None:
+            t = np.concatenate(([self.last[0]], t))
+            v = np.concatenate(([self.last[1]], v))
+        else:
+            self.start = t[0]
+
+        self.integral += np.sum(np.diff(t) * (v[1:] + v[:-1])) / 2
+        self.last = (t[-1], v[-1])
+
+    def value(self):
+        if self.last is None:
+            return np.nan
+
+        duration = self.last[0] - self.start
+        if duration <= 0:
+            mean = self.last[1]
+        else:
+            mean = self.integral / duration
+        return np.sqrt(mean) if self.metric == "rms" else mean
+
+
+class Samples:
+    # keeps every sample in the window, for metrics of the whole waveform
+    def __init__(self, func, **options):
+        self.func = func
+        self.options = options
+        self.t = []
+        self.v = []
+
+    def update(self, t, v):
+        self.t.append(np.array(t))
+        self.v.append(np.array(v))
+
+    def value(self):
+        t = np.concatenate(self.t) if self.t else np.empty(0)
+        v = np.concatenate(self.v) if self.v else np.empty(0)
+        return self.func(t, v, **self.options)
+
+
+class Window:
+    # passes a metric the samples between start and stop, with the values at
+    # start and stop interpolated from the samples around them, since NL5 only
+    # stores the samples it needs and a switching waveform may have none in
+    # the window at all
+    def __init__(self, metric, start, stop):
+        self.metric = metric
+        self.start = start
+        self.stop = stop
+        self.started = False
+        self.done = False
+        self.last = None
+
+    def update(self, t, v):
+        if self.done or not len(t):
+            return
+
+        # the last sample of the previous chunk, to interpolate from
+        if self.last is not None:
+            t = np.concatenate(([self.last[0]], t))
+            v = np.concatenate(([self.last[1]], v))
+        self.last = (t[-1], v[-1])
+
+        first = np.searchsorted(t, self.start) if not self.started else 1
+        last = np.searchsorted(t, self.stop, "right")
+        if first == len(t):
+            return
+
+        head_t, head_v = [], []
+        if not self.started:
+            self.started = True
+            if first > 0 and t[first] > self.start:
+                head_t = [self.start]
+                head_v = [
+                    np.interp(
+                        self.start, t[first - 1 : first + 1], v[first - 1 : first + 1]
+                    )
+                ]
+
+        tail_t, tail_v = [], []
+        if last < len(t):
+            self.done = True
+            if last > 0 and t[last - 1] < self.stop:
+                tail_t = [self.stop]
+                tail_v = [
+                    np.interp(self.stop, t[last - 1 : last + 1], v[last - 1 : last + 1])
+                ]
+
+        self.metric.update(
+            np.concatenate((head_t, t[first:last], tail_t)),
+            np.concatenate((head_v, v[first:last], tail_v)),
+        )
+
+    def value(self):
+        return self.metric.value()
+
+
+def thd(t, v, frequency=None, harmonics=50):
+    # total harmonic distortion, relative to the fundamental, from the FFT of
+    # the samples resampled uniformly over the window, which is trimmed to the
+    # nearest whole number of periods ending at its last sample when the
+    # fundamental frequency is given
+    if len(t) < 2:
+        return np.nan
+
+    duration = t[-1] - t[0]
+    if frequency is not None:
+        periods = int(round(duration * frequency))
+        if periods == 0:
+            return np.nan
+        duration = periods / frequency
+
+    n = max(len(t), 1024)
+    uniform = np.interp(t[-1] - duration + duration * np.arange(n) / n, t, v)
+    spectrum = np.abs(np.fft.rfft(uniform))
+
+    # the fundamental is the largest component unless it is given
+    if frequency is None:
+        fundamental = np.argmax(spectrum[1:]) + 1
+    else:
+        fundamental = periods
+    harmonic_bins = fundamental * np.arange(2, harmonics + 2)
+    harmonic_bins = harmonic_bins[harmonic_bins < len(spectrum)]
+
+    return np.sqrt(np.sum(spectrum[harmonic_bins] ** 2)) / spectrum[fundamental]
+
+
+def create_metric(spec, options):
+    if callable(spec):
+        return Samples(spec, **options)
+    if spec in ("max", "min", "pk2pk"):
+        return Extremes(spec)
+    if spec in ("avg", "rms"):
+        return Integral(spec)
+    if spec == "thd":
+        return Samples(thd, **options)
+    raise ValueError(f"unknown metric {spec!r}")
+
+
+def parse_measurements(measurements):
+    # name -> (trace, metric, window) or (trace, metric, window, options)
+    parsed = {}
+    for name, spec in measurements.items():
+        trace, func, window, *options = spec
+        parsed[name] = (trace, func, window, options[0] if options else {})
+    return parsed
+
+
+def window_bounds(window, end):
+    # None is the whole trace, a number is that much time before end, and a
+    # (start, stop) pair is an absolute range
+    if window is None:
+        return -np.inf, np.inf
+    if np.isscalar(window):
+        return end - window, np.inf
+    return tuple(window)
@@ -0,0 +1,339 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from .sweep import run_sweep
+
+# the outcome of a Monte Carlo run, where samples holds one row per simulation
+# with its parameters and metrics, yield_ is (estimate, low, high) or None, and
+# percentiles has an (estimate, low, high) row per metric and percentile
+MonteCarloResult = namedtuple(
+    "MonteCarloResult", ["samples", "yield_", "percentiles", "converged"]
+)
+
+# a normally distributed tolerance is this many standard deviations
+SIGMAS = 3
+
+# primitive polynomials (degree s, coefficients a) and initial direction
+# numbers m of the Sobol sequence in dimensions 2 to 21, from the
+# new-joe-kuo-6.21201 table of Joe and Kuo
+SOBOL_TABLE = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+]
+SOBOL_BITS = 32
+
+# coefficients of Acklam's rational approximation to the inverse normal CDF
+_A = (-39.69683028665376, 220.9460984245205, -275.9285104469687)
+_A += (138.3577518672690, -30.66479806614716, 2.506628277459239)
+_B = (-54.47609879822406, 161.5858368580409, -155.6989798598866)
+_B += (66.80131188771972, -13.28068155288572)
+_C = (-7.784894002430293e-03, -0.3223964580411365, -2.400758277161838)
+_C += (-2.549732539343734, 4.374664141464968, 2.938163982698783)
+_D = (7.784695709041462e-03, 0.3224671290700398, 2.445134137142996)
+_D += (3.754408661907416,)
+_P_LOW = 0.02425
+
+
+def norm_ppf(p):
+    # inverse of the standard normal CDF, to a relative error of about 1e-9
+    p = np.asarray(p, dtype=float)
+    x = np.empty_like(p)
+
+    low = p < _P_LOW
+    high = p > 1 - _P_LOW
+    mid = ~(low | high)
+
+    q = p[mid] - 0.5
+    r = q * q
+    x[mid] = q * np.polyval(_A, r) / np.polyval(_B + (1,), r)
+
+    # the upper tail mirrors the lower one
+    q = np.sqrt(-2 * np.log(p[low]))
+    x[low] = np.polyval(_C, q) / np.polyval(_D + (1,), q)
+    q = np.sqrt(-2 * np.log(1 - p[high]))
+    x[high] = -np.polyval(_C, q) / np.polyval(_D + (1,), q)
+
+    return x
+
+
+def _direction_numbers(d):
+    if d > len(SOBOL_TABLE) + 1:
+        raise ValueError(
+            f"Sobol samples have at most {len(SOBOL_TABLE) + 1} dimensions, "
+            f"use Latin hypercube samples for {d}"
+        )
+
+    shifts = SOBOL_BITS - 1 - np.arange(SOBOL_BITS, dtype=np.uint64)
+    v = np.zeros((d, SOBOL_BITS), dtype=np.uint64)
+    v[0] = np.uint64(1) << shifts
+    for j, (s, a, m) in enumerate(SOBOL_TABLE[: d - 1], 1):
+        v[j, :s] = np.array(m, dtype=np.uint64) << shifts[:s]
+        for k in range(s, SOBOL_BITS):
+            value = v[j, k - s] ^ (v[j, k - s] >> np.uint64(s))
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    value ^= v[j, k - i]
+            v[j, k] = value
+    return v
+
+
+def sobol(n, d, start=0, rng=None):
+    # points start to start + n of the d dimensional Sobol sequence, in Gray
+    # code order, randomized with a digital shift when rng is given
+    v = _direction_numbers(d)
+    index = np.arange(start, start + n, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+
+    x = np.zeros((n, d), dtype=np.uint64)
+    for bit in range(SOBOL_BITS):
+        mask = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        x[mask] ^= v[:, bit]
+
+    if rng is not None:
+        x ^= rng.integers(0, 1 << SOBOL_BITS, size=d, dtype=np.uint64)
+
+    # the centre of each cell, so that no point is exactly 0
+    return (x.astype(float) + 0.5) / 2.0**SOBOL_BITS
+
+
+def latin_hypercube(n, d, rng):
+    # one point in each of n equal strata of every dimension
+    strata = rng.random((n, d)).argsort(axis=0)
+    return (strata + rng.random((n, d))) / n
+
+
+def unit_samples(method, n, d, batch, rng):
+    # n points in the unit hypercube, where Latin hypercubes are built one
+    # batch at a time so that any number of whole batches is stratified
+    if method == "random":
+        return rng.random((n, d))
+    if method == "sobol":
+        return sobol(n, d, rng=rng)
+    if method == "lhs":
+        return np.concatenate(
+            [
+                latin_hypercube(min(batch, n - start), d, rng)
+                for start in range(0, n, batch)
+            ]
+        )
+    raise ValueError(f"unknown sampling method {method!r}")
+
+
+def parse_tolerances(tolerances):
+    # name -> relative tolerance, or (tolerance, distribution)
+    parsed = {}
+    for name, spec in tolerances.items():
+        if np.isscalar(spec):
+            spec = (spec, "uniform")
+        tolerance, distribution = spec
+        if distribution not in ("uniform", "normal"):
+            raise ValueError(f"unknown distribution {distribution!r} for {name}")
+        parsed[name] = (tolerance, distribution)
+    return parsed
+
+
+def sample_tolerances(tolerances, nominal, u):
+    # values for each column of u, about the nominal values of the parameters
+    values = np.empty_like(u)
+    for j, (name, (tolerance, distribution)) in enumerate(tolerances.items()):
+        if distribution == "uniform":
+            deviation = tolerance * (2 * u[:, j] - 1)
+        else:
+            deviation = tolerance / SIGMAS * norm_ppf(u[:, j])
+        values[:, j] = nominal[name] * (1 + deviation)
+    return values
+
+
+def yield_interval(passed, n, z):
+    # Wilson score interval of the fraction of n samples that passed
+    if n == 0:
+        return np.nan, 0.0, 1.0
+
+    p = passed / n
+    scale = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / scale
+    half = z / scale * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return p, max(center - half, 0.0), min(center + half, 1.0)
+
+
+def percentile_interval(values, percentile, z):
+    # distribution-free interval from the order statistics around the
+    # percentile, which is unbounded until there are enough samples
+    values = np.sort(values[~np.isnan(values)])
+    n = len(values)
+    if n == 0:
+        return np.nan, -np.inf, np.inf
+
+    q = percentile / 100
+    spread = z * np.sqrt(n * q * (1 - q))
+    lower = int(np.floor(n * q - spread)) - 1
+    upper = int(np.ceil(n * q + spread))
+    return (
+        np.percentile(values, percentile),
+        values[lower] if lower >= 0 else -np.inf,
+        values[upper] if upper < n else np.inf,
+    )
+
+
+def _metric_columns(value):
+    if isinstance(value, dict):
+        return value
+    return {"metric": value}
+
+
+class _Statistics:
+    def __init__(self, passes, percentiles, confidence):
+        self.passes = passes
+        self.percentiles = list(percentiles)
+        self.z = float(norm_ppf((1 + confidence) / 2))
+        self.results = []
+
+    def add(self, result):
+        self.results.append(result)
+
+    def frame(self, names):
+        rows = []
+        results = sorted(self.results, key=lambda result: result.index)
+        for result in results:
+            row = dict(zip(names, result.params.values()))
+            if result.error is None:
+                row.update(_metric_columns(result.result))
+                if self.passes is not None:
+                    row["passed"] = bool(self.passes(result.result))
+            row["error"] = result.error
+            rows.append(row)
+
+        index = pd.Index([result.index for result in results], name="sample")
+        return pd.DataFrame(rows, index=index)
+
+    def estimates(self, names):
+        samples = self.frame(names)
+        valid = samples[samples["error"].isna()]
+
+        yield_ = None
+        if self.passes is not None:
+            yield_ = yield_interval(valid["passed"].sum(), len(valid), self.z)
+
+        metrics = [
+            column
+            for column in samples.columns
+            if column not in names and column not in ("passed", "error")
+        ]
+        rows = {
+            (metric, percentile): percentile_interval(
+                valid[metric].to_numpy(dtype=float), percentile, self.z
+            )
+            for metric in metrics
+            for percentile in self.percentiles
+        }
+        percentiles = pd.DataFrame(
+            list(rows.values()),
+            index=pd.MultiIndex.from_tuples(list(rows), names=["metric", "percentile"]),
+            columns=["estimate", "low", "high"],
+        )
+        return samples, yield_, percentiles
+
+
+def _converged(yield_, percentiles, yield_ci, percentile_ci):
+    # every interval that has a target is within half its width of it
+    if yield_ci is not None and (yield_[2] - yield_[1]) / 2 > yield_ci:
+        return False
+    if percentile_ci is not None and len(percentiles):
+        widths = (percentiles["high"] - percentiles["low"]) / 2
+        if not (widths <= percentile_ci).all():
+            return False
+    return True
+
+
+def run_monte_carlo(
+    schematic,
+    tolerances,
+    traces,
+    screen,
+    step,
+    metric,
+    passes=None,
+    percentiles=(),
+    samples=10_000,
+    method="lhs",
+    batch=100,
+    yield_ci=None,
+    percentile_ci=None,
+    confidence=0.95,
+    workers=None,
+    seed=None,
+):
+    if yield_ci is not None and passes is None:
+        raise ValueError("a yield target needs a passes function")
+
+    tolerances = parse_tolerances(tolerances)
+    names = list(tolerances)
+    nominal = schematic.get_values(names)
+
+    rng = np.random.default_rng(seed)
+    u = unit_samples(method, samples, len(names), batch, rng)
+    values = sample_tolerances(tolerances, nominal, u)
+    points = [dict(zip(names, row)) for row in values.tolist()]
+
+    statistics = _Statistics(passes, percentiles, confidence)
+    targets = yield_ci is not None or percentile_ci is not None
+    results = run_sweep(schematic, points, traces, screen, step, workers, metric)
+    try:
+        # results arrive as they finish, and are only added in sample order,
+        # so the estimates are always of whole batches, which keeps them
+        # stratified and independent of how long each sample took
+        finished = {}
+        converged = False
+        for result in results:
+            finished[result.index] = result
+            while not converged and len(statistics.results) in finished:
+                statistics.add(finished.pop(len(statistics.results)))
+
+                # checked once per batch, and stopping drops the queued points
+                if targets and len(statistics.results) % batch == 0:
+                    _, yield_, found = statistics.estimates(names)
+                    converged = _converged(yield_, found, yield_ci, percentile_ci)
+            if converged:
+                break
+    finally:
+        results.close()
+
+    samples, yield_, percentiles = statistics.estimates(names)
+    return MonteCarloResult(
+        samples,
+        yield_,
+        percentiles,
+        _converged(yield_, percentiles, yield_ci, percentile_ci),
+    )
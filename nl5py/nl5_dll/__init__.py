@@ -13,9 +13,11 @@
 #    limitations under the License.
 
 import platform
+from functools import lru_cache
 from importlib_resources import files
 import ctypes as ct
 
+
 # load the library
 def get_library(operating_system):
     if "Windows" in operating_system:
@@ -44,4 +46,25 @@ def get_library(operating_system):
     raise Exception(f"{operating_system} not supported")
 
 
-nl5_lib = get_library(platform.platform())
+@lru_cache(maxsize=None)
+def get_platform():
+    return platform.platform()
+
+
+# the library is loaded on first use rather than at import, so processes that
+# never call into NL5 do not pay for it
+_nl5_lib = None
+
+
+def load_library():
+    global _nl5_lib
+
+    if _nl5_lib is None:
+        _nl5_lib = get_library(get_platform())
+    return _nl5_lib
+
+
+def __getattr__(name):
+    if name == "nl5_lib":
+        return load_library()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
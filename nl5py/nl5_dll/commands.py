@@ -12,446 +12,275 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from pathlib import Path
-import os
 import ctypes as ct
-from . import nl5_lib
+import threading
+from . import load_library
 
+# last license file loaded, so worker processes can load it too
+_license_file = None
 
-def load_license(filepath):
-    return_code = NL5_GetLicense(filepath.encode())
-
-    # if return_code!=0, there was an issue with the license, so read
-    # the error register and raise exception
-    if return_code != 0:
-        error = NL5_GetError().decode("utf-8")
-        raise Exception(error)
-
-    # otherwise, the error register contains license info, which we return
-    license_info = NL5_GetError().decode("utf-8")
-    return license_info
-
-
-def NL5_GetError():
-    nl5_lib.NL5_GetError.argtypes = []
-    nl5_lib.NL5_GetError.restype = ct.c_char_p
-    return nl5_lib.NL5_GetError()
-
-
-def NL5_GetInfo():
-    nl5_lib.NL5_GetInfo.argtypes = []
-    nl5_lib.NL5_GetInfo.restype = ct.c_char_p
-    return nl5_lib.NL5_GetInfo()
-
-
-def NL5_GetLicense(name):
-    nl5_lib.NL5_GetLicense.argtypes = [ct.c_char_p]
-    nl5_lib.NL5_GetLicense.restype = ct.c_int
-    return nl5_lib.NL5_GetLicense(name)
-
-
-def NL5_Open(name):
-    nl5_lib.NL5_Open.argtypes = [ct.c_char_p]
-    nl5_lib.NL5_Open.restype = ct.c_int
-    return nl5_lib.NL5_Open(name)
-
-
-def NL5_Close(ncir):
-    nl5_lib.NL5_Close.argtypes = [ct.c_int]
-    nl5_lib.NL5_Close.restype = ct.c_int
-    return nl5_lib.NL5_Close(ncir)
-
-
-def NL5_Save(ncir):
-    nl5_lib.NL5_Save.argtypes = [ct.c_int]
-    nl5_lib.NL5_Save.restype = ct.c_int
-    return nl5_lib.NL5_Save(ncir)
-
-
-def NL5_SaveAs(ncir, name):
-    nl5_lib.NL5_SaveAs.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SaveAs.restype = ct.c_int
-    return nl5_lib.NL5_SaveAs(ncir, name)
-
-
-# New function 09/30/24
-def NL5_EnableCmp(ncir, name):
-    nl5_lib.NL5_EnableCmp.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SaveAs.restype = ct.c_int
-    nl5_lib.NL5_EnableCmp(ncir, name)
-
-
-# New function 09/30/24
-def NL5_DisableCmp(ncir, name):
-    nl5_lib.NL5_DisableCmp.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SaveAs.restype = ct.c_int
-    nl5_lib.NL5_DisableCmp(ncir, name)
-
-
-def NL5_GetValue(ncir, name, v):
-    nl5_lib.NL5_GetValue.argtypes = [ct.c_int, ct.c_char_p, ct.POINTER(ct.c_double)]
-    nl5_lib.NL5_GetValue.restype = ct.c_int
-    return nl5_lib.NL5_GetValue(ncir, name, v)
-
-
-def NL5_SetValue(ncir, name, v):
-    nl5_lib.NL5_SetValue.argtypes = [ct.c_int, ct.c_char_p, ct.c_double]
-    nl5_lib.NL5_SetValue.restype = ct.c_int
-    return nl5_lib.NL5_SetValue(ncir, name, v)
-
-
-def NL5_GetText(ncir, name, text, length):
-    nl5_lib.NL5_GetText.argtypes = [ct.c_int, ct.c_char_p, ct.c_char_p, ct.c_int]
-    nl5_lib.NL5_GetText.restype = ct.c_int
-    return nl5_lib.NL5_GetText(ncir, name, text, length)
-
-
-def NL5_SetText(ncir, name, text):
-    nl5_lib.NL5_SetText.argtypes = [ct.c_int, ct.c_char_p, ct.c_char_p]
-    nl5_lib.NL5_SetText.restype = ct.c_int
-    return nl5_lib.NL5_SetText(ncir, name, text)
-
-
-def NL5_GetParam(ncir, name):
-    nl5_lib.NL5_GetParam.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_GetParam.restype = ct.c_int
-    return nl5_lib.NL5_GetParam(ncir, name)
-
-
-def NL5_GetParamValue(ncir, npar, v):
-    nl5_lib.NL5_GetParamValue.argtypes = [ct.c_int, ct.c_int, ct.POINTER(ct.c_double)]
-    nl5_lib.NL5_GetParamValue.restype = ct.c_int
-    return nl5_lib.NL5_GetParamValue(ncir, npar, v)
-
-
-def NL5_SetParamValue(ncir, npar, v):
-    nl5_lib.NL5_SetParamValue.argtypes = [ct.c_int, ct.c_int, ct.c_double]
-    nl5_lib.NL5_SetParamValue.restype = ct.c_int
-    return nl5_lib.NL5_SetParamValue(ncir, npar, v)
-
-
-def NL5_GetParamText(ncir, npar, text, length):
-    nl5_lib.NL5_GetParamText.argtypes = [ct.c_int, ct.c_int, ct.c_char_p, ct.c_int]
-    nl5_lib.NL5_GetParamText.restype = ct.c_int
-    return nl5_lib.NL5_GetParamText(ncir, npar, text, length)
-
-
-def NL5_SetParamText(ncir, npar, text):
-    nl5_lib.NL5_SetParamText.argtypes = [ct.c_int, ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SetParamText.restype = ct.c_int
-    return nl5_lib.NL5_SetParamText(ncir, npar, text)
-
-
-def NL5_GetTracesSize(ncir):
-    nl5_lib.NL5_GetTracesSize.argtypes = [ct.c_int]
-    nl5_lib.NL5_GetTracesSize.restype = ct.c_int
-    return nl5_lib.NL5_GetTracesSize(ncir)
-
-
-def NL5_GetTraceAt(ncir, index):
-    nl5_lib.NL5_GetTraceAt.argtypes = [ct.c_int, ct.c_int]
-    nl5_lib.NL5_GetTraceAt.restype = ct.c_int
-    return nl5_lib.NL5_GetTraceAt(ncir, index)
-
-
-def NL5_GetTrace(ncir, name):
-    nl5_lib.NL5_GetTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_GetTrace.restype = ct.c_int
-    return nl5_lib.NL5_GetTrace(ncir, name)
-
-
-def NL5_GetTraceName(ncir, ntrace, name, length):
-    nl5_lib.NL5_GetTraceName.argtypes = [ct.c_int, ct.c_int, ct.c_char_p, ct.c_int]
-    nl5_lib.NL5_GetTraceName.restype = ct.c_int
-    return nl5_lib.NL5_GetTraceName(ncir, ntrace, name, length)
-
-
-def NL5_AddVTrace(ncir, name):
-    nl5_lib.NL5_AddVTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddVTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddVTrace(ncir, name)
-
-
-def NL5_AddITrace(ncir, name):
-    nl5_lib.NL5_AddITrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddITrace.restype = ct.c_int
-    return nl5_lib.NL5_AddITrace(ncir, name)
-
-
-def NL5_AddPTrace(ncir, name):
-    nl5_lib.NL5_AddPTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddPTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddPTrace(ncir, name)
-
-
-def NL5_AddVarTrace(ncir, name):
-    nl5_lib.NL5_AddVarTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddVarTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddVarTrace(ncir, name)
-
-
-def NL5_AddFuncTrace(ncir, text):
-    nl5_lib.NL5_AddFuncTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddFuncTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddFuncTrace(ncir, text)
-
-
-def NL5_AddDataTrace(ncir, text):
-    nl5_lib.NL5_AddDataTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddDataTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddDataTrace(ncir, text)
-
-
-def NL5_DeleteTrace(ncir, ntrace):
-    nl5_lib.NL5_DeleteTrace.argtypes = [ct.c_int, ct.c_int]
-    nl5_lib.NL5_DeleteTrace.restype = ct.c_int
-    return nl5_lib.NL5_DeleteTrace(ncir, ntrace)
-
-
-def NL5_SetStep(ncir, step):
-    nl5_lib.NL5_SetStep.argtypes = [ct.c_int, ct.c_double]
-    nl5_lib.NL5_SetStep.restype = ct.c_int
-    return nl5_lib.NL5_SetStep(ncir, step)
-
-
-def NL5_SetTimeout(ncir, t):
-    nl5_lib.NL5_SetTimeout.argtypes = [ct.c_int, ct.c_int]
-    nl5_lib.NL5_SetTimeout.restype = ct.c_int
-    return nl5_lib.NL5_SetTimeout(ncir, t)
+# the DLL has a single error register shared by every circuit and thread
+_error_lock = threading.Lock()
 
 
-def NL5_GetSimulationTime(ncir, t):
-    nl5_lib.NL5_GetSimulationTime.argtypes = [ct.c_int, ct.POINTER(ct.c_double)]
-    nl5_lib.NL5_GetSimulationTime.restype = ct.c_int
-    return nl5_lib.NL5_GetSimulationTime(ncir, t)
-
-
-def NL5_Start(ncir):
-    nl5_lib.NL5_Start.argtypes = [ct.c_int]
-    nl5_lib.NL5_Start.restype = ct.c_int
-    return nl5_lib.NL5_Start(ncir)
-
-
-def NL5_Simulate(ncir, interval):
-    nl5_lib.NL5_Simulate.argtypes = [ct.c_int, ct.c_double]
-    nl5_lib.NL5_Simulate.restype = ct.c_int
-    return nl5_lib.NL5_Simulate(ncir, interval)
-
-
-def NL5_SimulateInterval(ncir, interval):
-    nl5_lib.NL5_SimulateInterval.argtypes = [ct.c_int, ct.c_double]
-    nl5_lib.NL5_SimulateInterval.restype = ct.c_int
-    return nl5_lib.NL5_SimulateInterval(ncir, interval)
-
-
-def NL5_SimulateStep(ncir):
-    nl5_lib.NL5_SimulateStep.argtypes = [ct.c_int]
-    nl5_lib.NL5_SimulateStep.restype = ct.c_int
-    return nl5_lib.NL5_SimulateStep(ncir)
-
-
-def NL5_SaveIC(ncir):
-    nl5_lib.NL5_SaveIC.argtypes = [ct.c_int]
-    nl5_lib.NL5_SaveIC.restype = ct.c_int
-    return nl5_lib.NL5_SaveIC(ncir)
-
-
-def NL5_GetDataSize(ncir, ntrace):
-    nl5_lib.NL5_GetDataSize.argtypes = [ct.c_int, ct.c_int]
-    nl5_lib.NL5_GetDataSize.restype = ct.c_int
-    return nl5_lib.NL5_GetDataSize(ncir, ntrace)
-
-
-def NL5_GetDataAt(ncir, ntrace, n, t, data):
-    nl5_lib.NL5_GetDataAt.argtypes = [
-        ct.c_int,
-        ct.c_int,
-        ct.c_int,
-        ct.POINTER(ct.c_double),
-        ct.POINTER(ct.c_double),
-    ]
-    nl5_lib.NL5_GetDataAt.restype = ct.c_int
-    return nl5_lib.NL5_GetDataAt(ncir, ntrace, n, t, data)
-
-
-def NL5_GetLastData(ncir, ntrace, t, data):
-    nl5_lib.NL5_GetLastData.argtypes = [
-        ct.c_int,
-        ct.c_int,
-        ct.POINTER(ct.c_double),
-        ct.POINTER(ct.c_double),
-    ]
-    nl5_lib.NL5_GetLastData.restype = ct.c_int
-    return nl5_lib.NL5_GetLastData(ncir, ntrace, t, data)
-
-
-def NL5_GetData(ncir, ntrace, t, data):
-    nl5_lib.NL5_GetData.argtypes = [
-        ct.c_int,
-        ct.c_int,
-        ct.c_double,
-        ct.POINTER(ct.c_double),
-    ]
-    nl5_lib.NL5_GetData.restype = ct.c_int
-    return nl5_lib.NL5_GetData(ncir, ntrace, t, data)
-
-
-def NL5_DeleteOldData(ncir):
-    nl5_lib.NL5_DeleteOldData.argtypes = [ct.c_int]
-    nl5_lib.NL5_DeleteOldData.restype = ct.c_int
-    return nl5_lib.NL5_DeleteOldData(ncir)
-
-
-def NL5_SaveData(ncir, name):
-    nl5_lib.NL5_SaveData.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SaveData.restype = ct.c_int
-    return nl5_lib.NL5_SaveData(ncir, name)
-
-
-def NL5_AddData(ncir, ntrace, t, data):
-    nl5_lib.NL5_AddData.argtypes = [ct.c_int, ct.c_int, ct.c_double, ct.c_double]
-    nl5_lib.NL5_AddData.restype = ct.c_int
-    return nl5_lib.NL5_AddData(ncir, ntrace, t, data)
-
-
-def NL5_DeleteData(ncir, name):
-    nl5_lib.NL5_DeleteData.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_DeleteData.restype = ct.c_int
-    return nl5_lib.NL5_DeleteData(ncir, name)
-
-
-def NL5_GetInput(ncir, name):
-    nl5_lib.NL5_GetInput.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_GetInput.restype = ct.c_int
-    return nl5_lib.NL5_GetInput(ncir, name)
-
-
-def NL5_SetInputValue(ncir, nin, v):
-    nl5_lib.NL5_SetInputValue.argtypes = [ct.c_int, ct.c_int, ct.c_double]
-    nl5_lib.NL5_SetInputValue.restype = ct.c_int
-    return nl5_lib.NL5_SetInputValue(ncir, nin, v)
-
-
-def NL5_SetInputLogicalValue(ncir, nin, i):
-    nl5_lib.NL5_SetInputLogicalValue.argtypes = [ct.c_int, ct.c_int, ct.c_int]
-    nl5_lib.NL5_SetInputLogicalValue.restype = ct.c_int
-    return nl5_lib.NL5_SetInputLogicalValue(ncir, nin, i)
-
-
-def NL5_GetOutput(ncir, name):
-    nl5_lib.NL5_GetOutput.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_GetOutput.restype = ct.c_int
-    return nl5_lib.NL5_GetOutput(ncir, name)
-
-
-def NL5_GetOutputValue(ncir, nout, v):
-    nl5_lib.NL5_GetOutputValue.argtypes = [ct.c_int, ct.c_int, ct.POINTER(ct.c_double)]
-    nl5_lib.NL5_GetOutputValue.restype = ct.c_int
-    return nl5_lib.NL5_GetOutputValue(ncir, nout, v)
-
-
-def NL5_GetOutputLogicalValue(ncir, nout, i):
-    nl5_lib.NL5_GetOutputLogicalValue.argtypes = [
-        ct.c_int,
-        ct.c_int,
-        ct.POINTER(ct.c_int),
-    ]
-    nl5_lib.NL5_GetOutputLogicalValue.restype = ct.c_int
-    return nl5_lib.NL5_GetOutputLogicalValue(ncir, nout, i)
-
-
-def NL5_SetAC(ncir, ffrom, fto, points, scale):
-    nl5_lib.NL5_SetAC.argtypes = [
-        ct.c_int,
-        ct.c_double,
-        ct.c_double,
-        ct.c_int,
-        ct.c_int,
-    ]
-    nl5_lib.NL5_SetAC.restype = ct.c_int
-    return nl5_lib.NL5_SetAC(ncir, ffrom, fto, points, scale)
-
-
-def NL5_SetACSource(ncir, name):
-    nl5_lib.NL5_SetACSource.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SetACSource.restype = ct.c_int
-    return nl5_lib.NL5_SetACSource(ncir, name)
-
-
-def NL5_AddVACTrace(ncir, name):
-    nl5_lib.NL5_AddVACTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddVACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddVACTrace(ncir, name)
-
-
-def NL5_AddIACTrace(ncir, name):
-    nl5_lib.NL5_AddIACTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddIACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddIACTrace(ncir, name)
-
-
-def NL5_AddFuncACTrace(ncir, name):
-    nl5_lib.NL5_AddFuncACTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_AddFuncACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddFuncACTrace(ncir, name)
-
-
-def NL5_AddZACTrace(ncir):
-    nl5_lib.NL5_AddZACTrace.argtypes = [ct.c_int]
-    nl5_lib.NL5_AddZACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddZACTrace(ncir)
-
-
-def NL5_AddGammaACTrace(ncir):
-    nl5_lib.NL5_AddGammaACTrace.argtypes = [ct.c_int]
-    nl5_lib.AddGammaACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddGammaACTrace(ncir)
-
-
-def NL5_AddVSWRACTrace(ncir):
-    nl5_lib.NL5_AddVSWRACTrace.argtypes = [ct.c_int]
-    nl5_lib.NL5_AddVSWRACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddVSWRACTrace(ncir)
-
-
-def NL5_AddLoopACTrace(ncir):
-    nl5_lib.NL5_AddLoopACTrace.argtypes = [ct.c_int]
-    nl5_lib.NL5_AddLoopACTrace.restype = ct.c_int
-    return nl5_lib.NL5_AddLoopACTrace(ncir)
-
-
-def NL5_CalcAC(ncir):
-    nl5_lib.NL5_CalcAC.argtypes = [ct.c_int]
-    nl5_lib.NL5_CalcAC.restype = ct.c_int
-    return nl5_lib.NL5_CalcAC(ncir)
-
-
-def NL5_GetACTrace(ncir, name):
-    nl5_lib.NL5_GetACTrace.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_GetACTrace.restype = ct.c_int
-    return nl5_lib.NL5_GetACTrace(ncir, name)
-
-
-def NL5_GetACDataSize(ncir, ntrace):
-    nl5_lib.NL5_GetACDataSize.argtypes = [ct.c_int, ct.c_int]
-    nl5_lib.NL5_GetACDataSize.restype = ct.c_int
-    return nl5_lib.NL5_GetACDataSize(ncir, ntrace)
-
+def load_license(filepath):
+    global _license_file
 
-def NL5_GetACDataAt(ncir, ntrace, n, f, mag, phase):
-    nl5_lib.NL5_GetACDataAt.argtypes = [
-        ct.c_int,
-        ct.c_int,
-        ct.c_int,
-        ct.POINTER(ct.c_double),
-        ct.POINTER(ct.c_double),
-        ct.POINTER(ct.c_double),
-    ]
-    nl5_lib.NL5_GetACDataAt.restype = ct.c_int
-    return nl5_lib.NL5_GetACDataAt(ncir, ntrace, n, f, mag, phase)
+    with _error_lock:
+        return_code = _function("NL5_GetLicense")(filepath.encode())
+        message = _function("NL5_GetError")().decode("utf-8")
 
+    # if return_code!=0, there was an issue with the license, so raise the
+    # message from the error register
+    if return_code != 0:
+        raise Exception(message)
 
-def NL5_SaveACData(ncir, name):
-    nl5_lib.NL5_SaveACData.argtypes = [ct.c_int, ct.c_char_p]
-    nl5_lib.NL5_SaveACData.restype = ct.c_int
-    return nl5_lib.NL5_SaveACData(ncir, name)
+    # otherwise, the error register contains license info, which we return
+    _license_file = filepath
+    return message
+
+
+def _read_error(code):
+    # the caller holds _error_lock
+    message = _function("NL5_GetError")().decode("utf-8")
+
+    # a successful call on another thread resets the register to "OK"
+    if message == "OK":
+        message = f"NL5 call failed with code {code}"
+    return Exception(message)
+
+
+def nl5_error(code=-1):
+    # NL5 functions return a negative code on failure, and the error register
+    # only describes the most recent call, so this is read straight after one
+    with _error_lock:
+        return _read_error(code)
+
+
+def nl5_call(func, *args, **kwargs):
+    # calls func and reads the error register if it fails, under one lock, so
+    # a failure on another thread can't overwrite the message in between, and
+    # returns (code, error) where error is None on success
+    with _error_lock:
+        code = func(*args, **kwargs)
+        return code, _read_error(code) if code < 0 else None
+
+
+# C types used by the prototypes in nl5_dll.h
+_int = ct.c_int
+_double = ct.c_double
+_str = ct.c_char_p
+_p_int = ct.POINTER(ct.c_int)
+_p_double = ct.POINTER(ct.c_double)
+
+
+# ---------- Prototypes, in nl5_dll.h order ----------
+# name: (restype, argtypes)
+_PROTOTYPES = {
+    # info
+    "NL5_GetInfo": (_str, []),
+    "NL5_GetError": (_str, []),
+    "NL5_GetLicense": (_int, [_str]),
+    # files
+    "NL5_Open": (_int, [_str]),
+    "NL5_Save": (_int, [_int]),
+    "NL5_SaveAs": (_int, [_int, _str]),
+    "NL5_Close": (_int, [_int]),
+    # values
+    "NL5_GetValue": (_int, [_int, _str, _p_double]),
+    "NL5_SetValue": (_int, [_int, _str, _double]),
+    "NL5_GetText": (_int, [_int, _str, _str, _int]),
+    "NL5_SetText": (_int, [_int, _str, _str]),
+    # parameter handles
+    "NL5_GetParam": (_int, [_int, _str]),
+    "NL5_GetParamValue": (_int, [_int, _int, _p_double]),
+    "NL5_SetParamValue": (_int, [_int, _int, _double]),
+    "NL5_GetParamText": (_int, [_int, _int, _str, _int]),
+    "NL5_SetParamText": (_int, [_int, _int, _str]),
+    # components
+    "NL5_DisableCmp": (_int, [_int, _str]),
+    "NL5_EnableCmp": (_int, [_int, _str]),
+    # transient traces
+    "NL5_AddVTrace": (_int, [_int, _str]),
+    "NL5_AddITrace": (_int, [_int, _str]),
+    "NL5_AddPTrace": (_int, [_int, _str]),
+    "NL5_AddVarTrace": (_int, [_int, _str]),
+    "NL5_AddFuncTrace": (_int, [_int, _str]),
+    "NL5_AddDataTrace": (_int, [_int, _str]),
+    "NL5_GetTracesSize": (_int, [_int]),
+    "NL5_GetTraceAt": (_int, [_int, _int]),
+    "NL5_GetTrace": (_int, [_int, _str]),
+    "NL5_GetTraceName": (_int, [_int, _int, _str, _int]),
+    "NL5_DeleteTrace": (_int, [_int, _int]),
+    "NL5_DeleteAllTraces": (_int, [_int]),
+    # transient simulation
+    "NL5_SetTimeout": (_int, [_int, _int]),
+    "NL5_SetStep": (_int, [_int, _double]),
+    "NL5_GetSimulationTime": (_int, [_int, _p_double]),
+    "NL5_Start": (_int, [_int]),
+    "NL5_Simulate": (_int, [_int, _double]),
+    "NL5_SimulateInterval": (_int, [_int, _double]),
+    "NL5_SimulateStep": (_int, [_int]),
+    "NL5_SaveIC": (_int, [_int]),
+    # inputs/outputs
+    "NL5_GetInput": (_int, [_int, _str]),
+    "NL5_SetInputValue": (_int, [_int, _int, _double]),
+    "NL5_SetInputLogicalValue": (_int, [_int, _int, _int]),
+    "NL5_GetOutput": (_int, [_int, _str]),
+    "NL5_GetOutputValue": (_int, [_int, _int, _p_double]),
+    "NL5_GetOutputLogicalValue": (_int, [_int, _int, _p_int]),
+    # transient data
+    "NL5_GetDataSize": (_int, [_int, _int]),
+    "NL5_GetDataAt": (_int, [_int, _int, _int, _p_double, _p_double]),
+    "NL5_GetLastData": (_int, [_int, _int, _p_double, _p_double]),
+    "NL5_GetData": (_int, [_int, _int, _double, _p_double]),
+    "NL5_DeleteOldData": (_int, [_int]),
+    "NL5_SaveData": (_int, [_int, _str]),
+    "NL5_AddData": (_int, [_int, _int, _double, _double]),
+    "NL5_DeleteData": (_int, [_int, _int]),
+    # AC traces
+    "NL5_AddVACTrace": (_int, [_int, _str]),
+    "NL5_AddIACTrace": (_int, [_int, _str]),
+    "NL5_AddFuncACTrace": (_int, [_int, _str]),
+    "NL5_AddZACTrace": (_int, [_int, _str]),
+    "NL5_AddGammaACTrace": (_int, [_int]),
+    "NL5_AddVSWRACTrace": (_int, [_int]),
+    "NL5_AddLoopACTrace": (_int, [_int]),
+    "NL5_GetACTracesSize": (_int, [_int]),
+    "NL5_GetACTraceAt": (_int, [_int, _int]),
+    "NL5_GetACTrace": (_int, [_int, _str]),
+    "NL5_GetACTraceName": (_int, [_int, _int, _str, _int]),
+    "NL5_DeleteACTrace": (_int, [_int, _int]),
+    "NL5_DeleteAllACTraces": (_int, [_int]),
+    # AC simulation
+    "NL5_SetACSource": (_int, [_int, _str]),
+    "NL5_SetAC": (_int, [_int, _double, _double, _int, _int]),
+    "NL5_CalcAC": (_int, [_int]),
+    # AC data
+    "NL5_GetACDataSize": (_int, [_int, _int]),
+    "NL5_GetACDataAt": (_int, [_int, _int, _int, _p_double, _p_double, _p_double]),
+    "NL5_SaveACData": (_int, [_int, _str]),
+}
+
+# variants of the data getters that take raw addresses for their output
+# pointers, so values can be written straight into NumPy buffers
+# name: (symbol, restype, argtypes)
+_RAW_PROTOTYPES = {
+    "_NL5_GetDataAt_raw": (
+        "NL5_GetDataAt",
+        _int,
+        [_int, _int, _int, ct.c_void_p, ct.c_void_p],
+    ),
+    "_NL5_GetData_raw": ("NL5_GetData", _int, [_int, _int, _double, ct.c_void_p]),
+    "_NL5_GetACDataAt_raw": (
+        "NL5_GetACDataAt",
+        _int,
+        [_int, _int, _int, ct.c_void_p, ct.c_void_p, ct.c_void_p],
+    ),
+}
+
+
+def _bind(name):
+    # resolve a private function pointer and type it once, so calls never
+    # touch the attributes cached on the shared library handle
+    if name in _RAW_PROTOTYPES:
+        symbol, restype, argtypes = _RAW_PROTOTYPES[name]
+    else:
+        symbol = name
+        restype, argtypes = _PROTOTYPES[name]
+
+    func = load_library()[symbol]
+    func.restype = restype
+    func.argtypes = argtypes
+
+    # cache it as a module attribute, so later lookups never come back here
+    globals()[name] = func
+    return func
+
+
+# the names exported by "from nl5py.nl5_dll.commands import *", where each NL5
+# function is bound as it is imported
+__all__ = [
+    *_PROTOTYPES,
+    "load_license",
+    "nl5_error",
+    "nl5_call",
+    "get_data_arrays",
+    "get_data_at_times",
+    "add_data_arrays",
+    "get_ac_data_arrays",
+]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def __getattr__(name):
+    # the library is only loaded once the first function is looked up
+    if name in _PROTOTYPES or name in _RAW_PROTOTYPES:
+        return _bind(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _function(name):
+    # for use inside this module, where a bare name skips __getattr__
+    return globals().get(name) or _bind(name)
+
+
+def _addresses(a):
+    # the address of every element of a 1-D float64 array, which may be strided
+    if not len(a):
+        return range(0)
+
+    start = a.ctypes.data
+    return range(start, start + a.strides[0] * len(a), a.strides[0])
+
+
+# The bulk helpers below make their calls without _error_lock, so that other
+# threads aren't held up for a whole trace, and stop at the first that fails,
+# which is made again under the lock to read its error. Like nl5_call, they
+# return (code, error) where error is None on success.
+
+
+def get_data_arrays(ncir, ntrace, t, data, start=0):
+    # t and data must be preallocated float64 arrays of equal size, which are
+    # filled with the samples from index start onwards
+    get_data_at = _function("_NL5_GetDataAt_raw")
+    for n, t_address, data_address in zip(
+        range(start, start + len(t)), _addresses(t), _addresses(data)
+    ):
+        if get_data_at(ncir, ntrace, n, t_address, data_address) < 0:
+            return nl5_call(get_data_at, ncir, ntrace, n, t_address, data_address)
+    return 0, None
+
+
+def get_data_at_times(ncir, ntrace, times, data):
+    # data must be a preallocated float64 array the size of times
+    get_data = _function("_NL5_GetData_raw")
+    for t, data_address in zip(times.tolist(), _addresses(data)):
+        if get_data(ncir, ntrace, t, data_address) < 0:
+            return nl5_call(get_data, ncir, ntrace, t, data_address)
+    return 0, None
+
+
+def add_data_arrays(ncir, ntrace, t, data):
+    # appends the samples of the float64 arrays t and data to a Data trace
+    add_data = _function("NL5_AddData")
+    for t_value, data_value in zip(t.tolist(), data.tolist()):
+        if add_data(ncir, ntrace, t_value, data_value) < 0:
+            return nl5_call(add_data, ncir, ntrace, t_value, data_value)
+    return 0, None
+
+
+def get_ac_data_arrays(ncir, ntrace, f, mag, phase):
+    # f, mag, and phase must be preallocated float64 arrays of equal size
+    get_ac_data_at = _function("_NL5_GetACDataAt_raw")
+    for n, f_address, mag_address, phase_address in zip(
+        range(len(f)), _addresses(f), _addresses(mag), _addresses(phase)
+    ):
+        if get_ac_data_at(ncir, ntrace, n, f_address, mag_address, phase_address) < 0:
+            return nl5_call(
+                get_ac_data_at, ncir, ntrace, n, f_address, mag_address, phase_address
+            )
+    return 0, None
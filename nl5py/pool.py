@@ -0,0 +1,80 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import queue
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from .schematic import Schematic
+
+
+class SchematicPool:
+    # pre-opened copies of a schematic, each lent to one thread at a time, so
+    # independent simulations can run side by side in a thread pool
+    def __init__(self, filename, size, cache=None, profiler=None):
+        # a Schematic is cloned, so the copies start with its edits and traces
+        template = filename if isinstance(filename, Schematic) else None
+        self.filename = filename if template is None else template.filename
+
+        self._schematics = []
+        self._idle = queue.Queue()
+        try:
+            for _ in range(size):
+                if template is None:
+                    schematic = Schematic(filename, cache, profiler)
+                else:
+                    schematic = template.clone(cache, profiler)
+                self._schematics.append(schematic)
+                self._idle.put(schematic)
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self._schematics)
+
+    @contextmanager
+    def schematic(self, timeout=None):
+        # blocks until a copy is free, and raises queue.Empty after timeout
+        schematic = self._idle.get(timeout=timeout)
+        try:
+            yield schematic
+        finally:
+            self._idle.put(schematic)
+
+    def map(self, func, items, workers=None):
+        # calls func(schematic, item) for each item, returning results in order
+        def run(item):
+            with self.schematic() as schematic:
+                return func(schematic, item)
+
+        with ThreadPoolExecutor(max_workers=workers or len(self)) as executor:
+            yield from executor.map(run, items)
+
+    def close(self):
+        errors = []
+        for schematic in self._schematics:
+            try:
+                schematic.close()
+            except Exception as error:
+                errors.append(error)
+        self._schematics = []
+
+        if errors:
+            raise Exception("\n".join(str(error) for error in errors))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
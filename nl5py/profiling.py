@@ -0,0 +1,156 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# time inside a method is split between the solver (the DLL's simulation
+# calls), extraction (the ctypes loops copying data out of the DLL), and the
+# rest, which is Python and pandas
+CATEGORIES = ("solver", "extract")
+
+
+class Span:
+    def __init__(self, name, kind, span_id, parent):
+        self.name = name
+        self.kind = kind
+        self.span_id = span_id
+        self.parent = parent
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = {}
+        self.times = dict.fromkeys(CATEGORIES, 0)
+
+
+class Profiler:
+    # wall time, call counts and extracted bytes for the methods of the
+    # schematics it is attached to, through Schematic.profiler
+    def __init__(self, keep_spans=True):
+        self.keep_spans = keep_spans
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.bytes_extracted = 0
+            self.finished = []
+            self._next_id = 1
+            self.trace_id = os.urandom(16).hex()
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+            return stack
+
+    @contextmanager
+    def span(self, name, kind="method"):
+        stack = self._stack()
+        with self._lock:
+            span_id = self._next_id
+            self._next_id += 1
+        span = Span(name, kind, span_id, stack[-1] if stack else None)
+
+        stack.append(span)
+        start = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            duration = time.perf_counter_ns() - start
+            stack.pop()
+            span.end = span.start + duration
+            self._finish(span, duration)
+
+    def _finish(self, span, duration):
+        # a solver or extract span counts towards every method around it
+        if span.kind in CATEGORIES:
+            parent = span.parent
+            while parent is not None:
+                parent.times[span.kind] += duration
+                parent = parent.parent
+
+        with self._lock:
+            if span.kind == "method":
+                stats = self.stats.setdefault(
+                    span.name,
+                    {"calls": 0, "time": 0, **dict.fromkeys(CATEGORIES, 0)},
+                )
+                stats["calls"] += 1
+                stats["time"] += duration
+                for category in CATEGORIES:
+                    stats[category] += span.times[category]
+
+            if self.keep_spans:
+                self.finished.append(span)
+
+    def add_bytes(self, nbytes):
+        stack = self._stack()
+        if stack:
+            span = stack[-1]
+            span.attributes["bytes"] = span.attributes.get("bytes", 0) + nbytes
+        with self._lock:
+            self.bytes_extracted += nbytes
+
+    def to_dict(self):
+        # times in seconds, with python_time being whatever isn't spent in the
+        # solver or extracting data
+        with self._lock:
+            methods = {}
+            for name, stats in self.stats.items():
+                methods[name] = {
+                    "calls": stats["calls"],
+                    "time": stats["time"] / 1e9,
+                    "solver_time": stats["solver"] / 1e9,
+                    "extract_time": stats["extract"] / 1e9,
+                    "python_time": (stats["time"] - stats["solver"] - stats["extract"])
+                    / 1e9,
+                }
+            return {"methods": methods, "bytes_extracted": self.bytes_extracted}
+
+    def spans(self):
+        # finished spans in the shape of OpenTelemetry's span data
+        with self._lock:
+            return [
+                {
+                    "name": span.name,
+                    "trace_id": self.trace_id,
+                    "span_id": f"{span.span_id:016x}",
+                    "parent_span_id": (
+                        f"{span.parent.span_id:016x}" if span.parent else None
+                    ),
+                    "start_time_unix_nano": span.start,
+                    "end_time_unix_nano": span.end,
+                    "attributes": {"nl5py.kind": span.kind, **span.attributes},
+                }
+                for span in self.finished
+            ]
+
+
+def profiled(method):
+    # times the method when its schematic has a profiler attached
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.span(method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
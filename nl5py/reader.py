@@ -0,0 +1,140 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from urllib.parse import unquote_plus
+
+# a top level component of a schematic, where nodes holds the node numbers of
+# its pins in order, and properties its other attributes by lowercase name
+Component = namedtuple("Component", ["name", "type", "model", "nodes", "properties"])
+
+# attributes of a component which are not properties that can be set
+NON_PROPERTIES = {"type", "id", "name", "descr", "view"}
+
+# paths of the elements that are indexed, below the root
+COMPONENT_PATH = ("Doc", "Cir", "Cmps", "Cmp")
+TRACE_PATHS = {
+    ("Doc", "Tran", "Traces", "Trace"): "traces",
+    ("Doc", "Freq", "Traces", "Trace"): "ac_traces",
+}
+
+
+def _component(element):
+    attributes = element.attrib
+    nodes = []
+    properties = {}
+    for key, value in attributes.items():
+        if key.startswith("node") and key[4:].isdigit():
+            nodes.append((int(key[4:]), value))
+        elif key not in NON_PROPERTIES and not key.endswith("_txt"):
+            properties[key.lower()] = unquote_plus(value)
+
+    return Component(
+        attributes.get("name"),
+        attributes.get("type"),
+        attributes.get("model"),
+        [node for _, node in sorted(nodes)],
+        properties,
+    )
+
+
+def _trace_name(element):
+    return unquote_plus(element.get("name") or element.get("expr", ""))
+
+
+class SchematicIndex:
+    # components, nodes and traces of an .nl5 file, read straight from its
+    # XML without the DLL, so it needs neither the library nor a license
+    def __init__(self, filename):
+        self.filename = filename
+        self.components = {}
+        self.traces = []
+        self.ac_traces = []
+
+        # streamed, clearing each element once it's read, so memory stays low
+        # for large schematics
+        path = []
+        for event, element in ET.iterparse(filename, events=("start", "end")):
+            if event == "start":
+                path.append(element.tag)
+                continue
+
+            depth = len(path)
+            key = tuple(path[1:])
+            if key == COMPONENT_PATH:
+                component = _component(element)
+                self.components[component.name] = component
+            elif key in TRACE_PATHS:
+                getattr(self, TRACE_PATHS[key]).append(_trace_name(element))
+
+            path.pop()
+            if depth > 2:
+                element.clear()
+
+        # NL5 names are not case sensitive
+        self._names = {name.lower(): name for name in self.components}
+
+    def __len__(self):
+        return len(self.components)
+
+    def __contains__(self, name):
+        return name.lower() in self._names
+
+    def __getitem__(self, name):
+        return self.components[self._names[name.lower()]]
+
+    @property
+    def nodes(self):
+        # the components connected to each node
+        nodes = {}
+        for component in self.components.values():
+            for node in component.nodes:
+                nodes.setdefault(node, []).append(component.name)
+        return nodes
+
+    @property
+    def subcircuits(self):
+        return {
+            name: component
+            for name, component in self.components.items()
+            if component.type == "X_NL5"
+        }
+
+    def parameters(self):
+        # the value of each component, and its properties stored in the file
+        parameters = []
+        for name, component in self.components.items():
+            parameters.append(name)
+            parameters.extend(f"{name}.{key.upper()}" for key in component.properties)
+        return parameters
+
+    def find(self, type=None, model=None):
+        return [
+            component
+            for component in self.components.values()
+            if (type is None or component.type == type)
+            and (model is None or component.model == model)
+        ]
+
+    def validate(self, names):
+        # only the component part of "name.property" is checked, since some
+        # properties are stored under other names in the file
+        missing = [name for name in names if name.split(".")[0] not in self]
+        if missing:
+            raise ValueError(f"{', '.join(missing)} not found in {self.filename}")
+
+
+def read_schematic(filename):
+    return SchematicIndex(filename)
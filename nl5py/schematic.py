@@ -12,40 +12,470 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import os
+import tempfile
 import pandas as pd
 import numpy as np
-from .nl5_dll.commands import *
+from .nl5_dll import commands as nl5
+from .nl5_dll.commands import load_license, nl5_error, nl5_call
+from .cosim import CoSimulation
+from .measure import parse_measurements, create_metric, window_bounds, Window
+from .profiling import profiled
+from .reader import read_schematic
+from .search import find_boundary, map_boundary
 import ctypes as ct
+import threading
+import warnings
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
 
+# directory of the files that copies of a circuit are opened from, which is
+# memory-backed where possible so the DLL reads them without touching a disk
+TEMPLATE_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
 
-# decorator which will check for NL5 errors
-def check(func):
-    def checked(*args, **kwargs):
-        returned = func(*args, **kwargs)
+# initial conditions saved by Schematic.checkpoint, by parameter name, along
+# with the simulation time they were taken at
+Checkpoint = namedtuple("Checkpoint", ["time", "ics"])
 
-        # check for any NL5 errors and throw exception if there is an error
-        error = NL5_GetError()
-        if error != b"OK":
-            raise Exception(error.decode("utf-8"))
 
-        return returned
+def check_output(output):
+    if output not in ("pandas", "numpy", "structured"):
+        raise ValueError(f"unknown output {output!r}")
 
-    return checked
+
+def align_traces(trace_data, fill=True):
+    # trace_data holds a (2, n) array of times and values for each trace, which
+    # are combined into a shared time vector and a column-major value matrix
+    if not trace_data:
+        return np.empty(0), np.empty((0, 0))
+
+    # traces sampled at the same times can be stacked as they are
+    t = trace_data[0][0]
+    if all(np.array_equal(data[0], t) for data in trace_data):
+        values = np.empty((len(t), len(trace_data)), order="F")
+        for i, data in enumerate(trace_data):
+            values[:, i] = data[1]
+        return t, values
+
+    # otherwise align them on the sorted union of their times
+    t = np.unique(np.concatenate([data[0] for data in trace_data]))
+    values = np.full((len(t), len(trace_data)), np.nan, order="F")
+    for i, (trace_t, trace_values) in enumerate(trace_data):
+        # the latest sample at or before each time, which forward fills
+        index = np.searchsorted(trace_t, t, side="right") - 1
+        valid = index >= 0
+        if not fill:
+            valid &= trace_t[np.maximum(index, 0)] == t
+        values[valid, i] = trace_values[index[valid]]
+
+    return t, values
+
+
+def format_data(t, values, traces, output="pandas"):
+    if output == "numpy":
+        return t, values
+
+    if output == "structured":
+        data = np.empty(
+            len(t), dtype=[("time", float)] + [(trace, float) for trace in traces]
+        )
+        data["time"] = t
+        for i, trace in enumerate(traces):
+            data[trace] = values[:, i]
+        return data
+
+    # the data frame is a view over the value matrix
+    return pd.DataFrame(values, index=t, columns=list(traces), copy=False)
+
+
+def ac_data_frame(traces, arrays, as_complex=False):
+    # arrays holds the (frequency, magnitude, phase) arrays of each trace
+
+    # traces from the same AC simulation share their frequencies, so the
+    # frame can be built once for all of them
+    f = arrays[0][0] if arrays else np.empty(0)
+    if all(np.array_equal(trace_f, f) for trace_f, _, _ in arrays):
+        mag = np.column_stack([trace_mag for _, trace_mag, _ in arrays])
+        phase = np.column_stack([trace_phase for _, _, trace_phase in arrays])
+        return ac_frame(f, traces, mag, phase, as_complex)
+
+    # otherwise align the traces on the union of their frequencies
+    return pd.concat(
+        [
+            ac_frame(
+                trace_f, [trace], trace_mag[:, None], trace_phase[:, None], as_complex
+            )
+            for trace, (trace_f, trace_mag, trace_phase) in zip(traces, arrays)
+        ],
+        axis=1,
+        sort=True,
+    ).ffill()
+
+
+def ac_frame(f, traces, mag, phase, as_complex=False):
+    # mag and phase hold one column per trace, with the phase in degrees
+    if as_complex:
+        return pd.DataFrame(
+            mag * np.exp(1j * np.deg2rad(phase)), index=f, columns=list(traces)
+        )
+
+    # interleave magnitude and phase under a hierarchical column index
+    data = np.empty((len(f), 2 * len(traces)))
+    data[:, 0::2] = mag
+    data[:, 1::2] = phase
+    columns = pd.MultiIndex.from_product([list(traces), ["magnitude", "phase"]])
+    return pd.DataFrame(data, index=f, columns=columns)
+
+
+def _temporary_file():
+    fd, path = tempfile.mkstemp(suffix=".nl5", prefix="nl5py-", dir=TEMPLATE_DIR)
+    os.close(fd)
+    return path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class TraceIndex:
+    # the handles of one kind of trace by name, kept in step with the DLL as
+    # traces are added and deleted through the Schematic, so looking up a
+    # trace doesn't call into the DLL
+    def __init__(self, schematic, ac=False):
+        self.schematic = schematic
+        kind = "AC" if ac else ""
+        self._get_size = getattr(nl5, f"NL5_Get{kind}TracesSize")
+        self._get_at = getattr(nl5, f"NL5_Get{kind}TraceAt")
+        self._get_name = getattr(nl5, f"NL5_Get{kind}TraceName")
+        self._get_handle = getattr(nl5, f"NL5_Get{kind}Trace")
+
+        # names by handle in trace order, and the first handle for each name in
+        # lower case, since NL5 ignores case in trace names, or None until
+        # they're first needed
+        self._names = None
+        self._handles = None
+
+    def _load(self, length=100):
+        if self._names is None:
+            schematic = self.schematic
+            circuit = schematic.circuit
+            num_traces = schematic._lookup(self._get_size, circuit)
+            handles = [
+                schematic._lookup(self._get_at, circuit, i) for i in range(num_traces)
+            ]
+            self._names = {handle: self.read_name(handle, length) for handle in handles}
+            self._index_names()
+
+    def _index_names(self):
+        self._handles = {}
+        for handle, name in self._names.items():
+            self._handles.setdefault(name.lower(), handle)
+
+    def read_name(self, handle, length=100):
+        # the DLL returns the size the name needs, so a longer one is re-read
+        schematic = self.schematic
+        name = ct.create_string_buffer(length)
+        size = schematic._call(self._get_name, schematic.circuit, handle, name, length)
+        if size > length:
+            return self.read_name(handle, size)
+        return name.value.decode("utf-8")
+
+    def names(self, length=100):
+        self._load(length)
+        return list(self._names.values())
+
+    def __contains__(self, name):
+        self._load()
+        return name.lower() in self._handles
+
+    def handle(self, name):
+        self._load()
+        try:
+            return self._handles[name.lower()]
+        except KeyError:
+            pass
+
+        # a trace found by the DLL means it was added some other way
+        schematic = self.schematic
+        handle = schematic._lookup(self._get_handle, schematic.circuit, name.encode())
+        self.invalidate()
+        return handle
+
+    def add(self, handle):
+        if self._names is not None and handle >= 0:
+            name = self._names[handle] = self.read_name(handle)
+            self._handles.setdefault(name.lower(), handle)
+
+    def remove(self, handle):
+        if self._names is not None:
+            self._names.pop(handle, None)
+            self._index_names()
+
+    def clear(self):
+        self._names = {}
+        self._handles = {}
+
+    def invalidate(self):
+        self._names = None
+        self._handles = None
+
+
+class Parameter:
+    # a circuit parameter resolved to its NL5 handle once, so reads and writes
+    # skip the name lookup
+    def __init__(self, schematic, name):
+        self.schematic = schematic
+        self.name = name
+
+        # a handle is needed for everything else, so this never defers
+        self.handle = schematic._lookup(
+            nl5.NL5_GetParam, schematic.circuit, name.encode()
+        )
+
+        self._value = ct.c_double()
+        self._value_ref = ct.byref(self._value)
+
+    @property
+    def value(self):
+        schematic = self.schematic
+        schematic._call(
+            nl5.NL5_GetParamValue, schematic.circuit, self.handle, self._value_ref
+        )
+        return self._value.value
+
+    @value.setter
+    def value(self, value):
+        schematic = self.schematic
+        if (
+            schematic._call(
+                nl5.NL5_SetParamValue, schematic.circuit, self.handle, value
+            )
+            >= 0
+        ):
+            schematic._record(("parameter", self.name), "set_value", self.name, value)
+
+    def get_text(self, length=100):
+        schematic = self.schematic
+        text = ct.create_string_buffer(length)
+        schematic._call(
+            nl5.NL5_GetParamText, schematic.circuit, self.handle, text, length
+        )
+        return text.value.decode("utf-8")
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    @text.setter
+    def text(self, text):
+        schematic = self.schematic
+        if (
+            schematic._call(
+                nl5.NL5_SetParamText, schematic.circuit, self.handle, text.encode()
+            )
+            >= 0
+        ):
+            schematic._record(("parameter", self.name), "set_text", self.name, text)
 
 
 class Schematic:
-    @check
-    def __init__(self, filename):
-        self.circuit = NL5_Open(filename.encode())
+    def __init__(self, filename, cache=None, profiler=None):
+        self.filename = filename
+
+        # optional ResultCache used by run_transient and run_ac
+        self.cache = cache
+
+        # optional Profiler which times the methods of this schematic
+        self.profiler = profiler
+
+        # optional on_progress(t, screen) callback for transient simulations,
+        # called every progress_interval seconds with the simulated time
+        self.on_progress = None
+        self.progress_interval = 0.1
+
+        # errors collected inside a batch() block, None when raising immediately
+        self._deferred = None
+
+        # the last NL5_SetTimeout, which the DLL can't report, where 0 is its
+        # default of no limit
+        self._timeout = 0
+
+        self.circuit = self._call(nl5.NL5_Open, filename.encode())
+
+        # latest successful edit per target, so other processes can replay them,
+        # and a count of the edits, which changes whenever _changes does
+        self._changes = {}
+        self._revision = 0
+
+        # parameter handles resolved so far, by name
+        self._params = {}
+
+        # circuit input and output handles resolved so far, by name
+        self._inputs = {}
+        self._outputs = {}
+
+        # the SchematicIndex of the file, read when first needed
+        self._index = None
+
+        # trace handles by name
+        self._traces = TraceIndex(self)
+        self._ac_traces = TraceIndex(self, ac=True)
+
+        # (revision, path) of the saved state that clones are opened from
+        self._template = None
+
+        # file written by from_bytes, removed when this is closed
+        self._temporary = None
+
+    def _release(self):
+        # forgets the circuit and everything resolved in it, and returns it
+        circuit, self.circuit = self.circuit, None
+        self._params = {}
+        self._inputs = {}
+        self._outputs = {}
+        self._traces.invalidate()
+        self._ac_traces.invalidate()
+        self._remove_template()
+        if self._temporary is not None:
+            _remove(self._temporary)
+            self._temporary = None
+        return circuit
+
+    def close(self):
+        # release the circuit held by the DLL, after which this can't be used
+        if self.circuit is not None:
+            self._call(nl5.NL5_Close, self._release())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # the circuit is unset if opening it failed. Schematics are in reference
+        # cycles, so this usually runs in the garbage collector, which can start
+        # inside a call holding _error_lock on this thread, and so the circuit
+        # is closed without the lock or its error
+        if getattr(self, "circuit", None) is not None:
+            try:
+                nl5.NL5_Close(self._release())
+            except Exception:
+                pass
+
+    def _check(self, code, error=None):
+        if code < 0:
+            if error is None:
+                error = nl5_error(code)
+            if self._deferred is None:
+                raise error
+            self._deferred.append(error)
+        return code
+
+    def _call(self, func, *args, **kwargs):
+        # every DLL call other than the solver's goes through here
+        return self._check(*nl5_call(func, *args, **kwargs))
+
+    def _lookup(self, func, *args):
+        # a handle or size that the calls after it depend on, which is raised
+        # straight away even in a batch, rather than passed on as a bad value
+        code, error = nl5_call(func, *args)
+        if error is not None:
+            raise error
+        return code
+
+    def _span(self, name, kind):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.span(name, kind)
+
+    def _extract(self, func, nbytes, *args, **kwargs):
+        # one of the bulk extraction loops, which fills nbytes of arrays and
+        # only takes _error_lock for a call that fails
+        if self.profiler is None:
+            return self._check(*func(self.circuit, *args, **kwargs))
+
+        with self.profiler.span(func.__name__, "extract"):
+            self.profiler.add_bytes(nbytes)
+            return self._check(*func(self.circuit, *args, **kwargs))
+
+    def _solve(self, func, screen=None):
+        # one of the DLL's simulation calls, for a screen of time when given,
+        # which runs without holding _error_lock so that other circuits keep
+        # simulating, at the risk of another thread's call overwriting its error
+        with self._span(func.__name__, "solver"):
+            if self.on_progress is None or screen is None:
+                args = () if screen is None else (screen,)
+                return self._check(func(self.circuit, *args))
+            return self._check(*self._solve_with_progress(func, screen))
+
+    def _solve_with_progress(self, func, screen):
+        # the simulation runs on another thread, since the DLL releases the GIL,
+        # while this one polls the simulated time so callbacks stay on it
+        start = self.get_simulation_time()
+        result = []
+
+        def simulate():
+            code = func(self.circuit, screen)
+            result.append((code, nl5_error(code) if code < 0 else None))
+
+        thread = threading.Thread(target=simulate)
+        thread.start()
+        try:
+            while thread.is_alive():
+                thread.join(self.progress_interval)
+                self.on_progress(self.get_simulation_time() - start, screen)
+        finally:
+            thread.join()
+
+        return result[0]
+
+    @contextmanager
+    def batch(self):
+        # collect errors from the block and raise them together at the end
+        if self._deferred is not None:
+            yield self
+            return
+
+        self._deferred = []
+        try:
+            yield self
+        finally:
+            errors, self._deferred = self._deferred, None
+
+        if errors:
+            raise Exception("\n".join(str(error) for error in errors))
+
+    def _record(self, target, method, *args):
+        self._changes.pop(target, None)
+        self._changes[target] = (method, args)
+        self._revision += 1
+
+    def _unrecord(self, targets):
+        for target in targets:
+            if self._changes.pop(target, None) is not None:
+                self._revision += 1
+
+    def _cache_key(self, *settings):
+        if self.cache is None:
+            return None
+        return self.cache.key(self.filename, list(self._changes.values()), settings)
+
+    def _replay(self, changes):
+        for method, args in changes:
+            getattr(self, method)(*args)
 
     # ---------- Component enable/disable ----------
-    @check
     def enable_component(self, name):
-        NL5_EnableCmp(self.circuit, name.encode())
+        if self._call(nl5.NL5_EnableCmp, self.circuit, name.encode()) >= 0:
+            self._record(("component", name), "enable_component", name)
 
-    @check
     def disable_component(self, name):
-        NL5_DisableCmp(self.circuit, name.encode())
+        if self._call(nl5.NL5_DisableCmp, self.circuit, name.encode()) >= 0:
+            self._record(("component", name), "disable_component", name)
 
     def enable_components(self, names):
         for name in names:
@@ -56,230 +486,840 @@ class Schematic:
             self.disable_component(name)
 
     # ---------- Parameters / properties ----------
-    @check
     def set_value(self, name, value):
-        NL5_SetValue(self.circuit, name.encode(), value)
+        if self._call(nl5.NL5_SetValue, self.circuit, name.encode(), value) >= 0:
+            self._record(("parameter", name), "set_value", name, value)
 
-    @check
     def set_text(self, name, text):
-        NL5_SetText(self.circuit, name.encode(), text.encode())
+        if self._call(nl5.NL5_SetText, self.circuit, name.encode(), text.encode()) >= 0:
+            self._record(("parameter", name), "set_text", name, text)
 
-    @check
     def get_value(self, name):
         value = ct.c_double()
-        NL5_GetValue(self.circuit, name.encode(), value)
+        self._call(nl5.NL5_GetValue, self.circuit, name.encode(), value)
         return value.value
 
-    @check
     def get_text(self, name, length=100):
         text = ct.create_string_buffer(length)
-        NL5_GetText(self.circuit, name.encode(), text, length)
+        self._call(nl5.NL5_GetText, self.circuit, name.encode(), text, length)
         return text.value.decode("utf-8")
 
+    def param(self, name):
+        try:
+            return self._params[name]
+        except KeyError:
+            parameter = self._params[name] = Parameter(self, name)
+            return parameter
+
+    @profiled
+    def set_values(self, values):
+        for name, value in values.items():
+            self.param(name).value = value
+
+    @profiled
+    def get_values(self, names):
+        return {name: self.param(name).value for name in names}
+
     # ---------- Transient simulation ----------
-    @check
+    @profiled
     def simulate_transient(self, screen, step):
-        NL5_SetStep(self.circuit, step)
-        NL5_Start(self.circuit)
-        NL5_Simulate(self.circuit, screen)
+        self._call(nl5.NL5_SetStep, self.circuit, step)
+        self._call(nl5.NL5_Start, self.circuit)
+        self._solve(nl5.NL5_Simulate, screen)
 
-    @check
+    @profiled
     def continue_transient(self, screen, step):
-        NL5_SetStep(self.circuit, step)
-        NL5_Simulate(self.circuit, screen)
+        self._call(nl5.NL5_SetStep, self.circuit, step)
+        self._solve(nl5.NL5_Simulate, screen)
 
-    @check
+    @profiled
     def simulate_interval(self, screen, step):
-        NL5_SetStep(self.circuit, step)
-        NL5_Start(self.circuit)
-        NL5_SimulateInterval(self.circuit, screen)
+        self._call(nl5.NL5_SetStep, self.circuit, step)
+        self._call(nl5.NL5_Start, self.circuit)
+        self._solve(nl5.NL5_SimulateInterval, screen)
 
-    @check
+    @profiled
     def continue_interval(self, screen, step):
-        NL5_SetStep(self.circuit, step)
-        NL5_SimulateInterval(self.circuit, screen)
+        self._call(nl5.NL5_SetStep, self.circuit, step)
+        self._solve(nl5.NL5_SimulateInterval, screen)
+
+    def set_timeout(self, timeout):
+        # an upper limit on the wall time of a simulation call, in seconds
+        timeout = int(np.ceil(timeout))
+        self._call(nl5.NL5_SetTimeout, self.circuit, timeout)
+        self._timeout = timeout
+
+    def get_simulation_time(self):
+        # safe to call from another thread while a simulation is running
+        t = ct.c_double()
+        self._call(nl5.NL5_GetSimulationTime, self.circuit, t)
+        return t.value
+
+    @property
+    def index(self):
+        # the components and traces in the file, read without the DLL
+        if self._index is None:
+            self._index = read_schematic(self.filename)
+        return self._index
+
+    def _ic_parameters(self):
+        # the IC parameter of every top level component which has one
+        return [
+            f"{name}.IC"
+            for name, component in self.index.components.items()
+            if "ic" in component.properties
+        ]
+
+    @profiled
+    def checkpoint(self):
+        # NL5_SaveIC stores the present state as the initial conditions, so the
+        # next simulation starts from it, and they're read back to restore later
+        time = self.get_simulation_time()
+        self._call(nl5.NL5_SaveIC, self.circuit)
+
+        # the state inside subcircuits is saved by NL5 too, but can't be read
+        # back, so it isn't restored or replayed
+        subcircuits = list(self.index.subcircuits)
+        if subcircuits:
+            warnings.warn(
+                f"the state inside subcircuits {', '.join(subcircuits)} is not "
+                "part of the checkpoint, so restore and sweep workers start "
+                "them from their own initial conditions",
+                stacklevel=2,
+            )
+
+        ics = {name: self.get_text(name) for name in self._ic_parameters()}
+        for name, text in ics.items():
+            self._record(("parameter", name), "set_text", name, text)
+
+        return Checkpoint(time, ics)
+
+    def restore(self, checkpoint):
+        # simulations started after this begin from the checkpointed state, at
+        # time zero, and sweep workers replay it like any other edit
+        for name, text in checkpoint.ics.items():
+            self.set_text(name, text)
+
+    # ---------- Co-simulation ----------
+    def get_input(self, name):
+        try:
+            return self._inputs[name]
+        except KeyError:
+            handle = self._lookup(nl5.NL5_GetInput, self.circuit, name.encode())
+            self._inputs[name] = handle
+            return handle
+
+    def get_output(self, name):
+        try:
+            return self._outputs[name]
+        except KeyError:
+            handle = self._lookup(nl5.NL5_GetOutput, self.circuit, name.encode())
+            self._outputs[name] = handle
+            return handle
+
+    def set_input(self, name, value):
+        # booleans set the logical value of the input
+        if isinstance(value, bool):
+            self._call(
+                nl5.NL5_SetInputLogicalValue, self.circuit, self.get_input(name), value
+            )
+        else:
+            self._call(nl5.NL5_SetInputValue, self.circuit, self.get_input(name), value)
+
+    def get_output_value(self, name):
+        value = ct.c_double()
+        self._call(nl5.NL5_GetOutputValue, self.circuit, self.get_output(name), value)
+        return value.value
+
+    def get_output_logical_value(self, name):
+        value = ct.c_int()
+        self._call(
+            nl5.NL5_GetOutputLogicalValue, self.circuit, self.get_output(name), value
+        )
+        return bool(value.value)
+
+    def simulate_step(self):
+        # not deferred in a batch, like the steps of a CoSimulation
+        code = nl5.NL5_SimulateStep(self.circuit)
+        if code < 0:
+            raise nl5_error(code)
+
+    def cosim(self, inputs, outputs):
+        return CoSimulation(self, inputs, outputs)
+
+    @profiled
+    def run_cosim(self, controller, t_end, step, inputs, outputs):
+        # starts a new simulation, in which controller(t, outputs) returns the
+        # input values for each step, and returns the number of steps taken
+        cosim = self.cosim(inputs, outputs)
+        cosim.start(step)
+        return cosim.run(controller, t_end)
 
     # ---------- Traces ----------
     def get_trace_names(self, length=100):
-        num_traces = NL5_GetTracesSize(self.circuit)
-        trace_names = num_traces * [""]
-        for i in range(num_traces):
-            trace_number = NL5_GetTraceAt(self.circuit, i)
-
-            trace_name = ct.create_string_buffer(length)
-            NL5_GetTraceName(self.circuit, trace_number, trace_name, length)
-            trace_names[i] = trace_name.value.decode("utf-8")
-        return trace_names
+        # length is the initial size of the name buffer, which grows as needed
+        return self._traces.names(length)
 
-    @check
     def add_trace(self, name, trace_type="Func"):
         # map the correct trace adding function
         func = {
-            "V": NL5_AddVTrace,
-            "I": NL5_AddITrace,
-            "P": NL5_AddPTrace,
-            "Var": NL5_AddVarTrace,
-            "Func": NL5_AddFuncTrace,
-            "Data": NL5_AddDataTrace,
+            "V": nl5.NL5_AddVTrace,
+            "I": nl5.NL5_AddITrace,
+            "P": nl5.NL5_AddPTrace,
+            "Var": nl5.NL5_AddVarTrace,
+            "Func": nl5.NL5_AddFuncTrace,
+            "Data": nl5.NL5_AddDataTrace,
         }[trace_type]
 
-        func(self.circuit, name.encode())
+        self._traces.add(self._call(func, self.circuit, name.encode()))
+
+    @profiled
+    def add_traces(self, names, trace_type="Func"):
+        # every trace is attempted, and any errors are raised together
+        with self.batch():
+            for name in names:
+                self.add_trace(name, trace_type)
 
-    @check
     def delete_trace(self, name):
         trace_number = self.get_trace_number(name)
-        NL5_DeleteTrace(self.circuit, trace_number)
+        if self._call(nl5.NL5_DeleteTrace, self.circuit, trace_number) >= 0:
+            self._traces.remove(trace_number)
+            self._unrecord([("data trace", name.lower())])
 
     def clear_traces(self):
-        trace_number = NL5_GetTraceAt(self.circuit, 0)
-        while trace_number >= 0:  # fix HTML artifact
-            NL5_DeleteTrace(self.circuit, trace_number)
-            trace_number = NL5_GetTraceAt(self.circuit, 0)
+        if self._call(nl5.NL5_DeleteAllTraces, self.circuit) >= 0:
+            self._traces.clear()
+            self._unrecord([key for key in self._changes if key[0] == "data trace"])
+
+    @profiled
+    def load_data_trace(self, name, t, values):
+        # a Data trace holding the given samples, for use as a stimulus, where
+        # the data of an existing trace is replaced rather than appended to
+        t = np.array(t, dtype=float)
+        values = np.array(values, dtype=float)
+        if t.ndim != 1 or t.shape != values.shape:
+            raise ValueError("t and values must be 1-D arrays of the same length")
+
+        if name in self._traces:
+            trace_number = self.get_trace_number(name)
+            self._call(nl5.NL5_DeleteData, self.circuit, trace_number)
+        else:
+            self.add_trace(name, "Data")
+            trace_number = self.get_trace_number(name)
+
+        self._check(*nl5.add_data_arrays(self.circuit, trace_number, t, values))
+
+        # the samples are part of the circuit's state, for cache keys and for
+        # the copies made by clone and sweep workers
+        self._record(("data trace", name.lower()), "load_data_trace", name, t, values)
 
-    @check
     def get_trace_number(self, trace):
-        return NL5_GetTrace(self.circuit, trace.encode())
+        return self._traces.handle(trace)
 
-    @check
     def get_data_at(self, trace, n):
         trace_number = self.get_trace_number(trace)
 
         t = ct.c_double()
         data = ct.c_double()
-        NL5_GetDataAt(self.circuit, trace_number, n, t, data)
+        self._call(nl5.NL5_GetDataAt, self.circuit, trace_number, n, t, data)
 
         return t.value, data.value
 
-    @check
     def get_last_data(self, trace):
         trace_number = self.get_trace_number(trace)
 
         t = ct.c_double()
         data = ct.c_double()
-        NL5_GetLastData(self.circuit, trace_number, t, data)
+        self._call(nl5.NL5_GetLastData, self.circuit, trace_number, t, data)
 
         return t.value, data.value
 
-    @check
-    def get_trace_data(self, trace):
+    def _sample_index(self, trace_number, n, time, side="left"):
+        # bisect the sample times, like np.searchsorted, without extracting them
+        t = ct.c_double()
+        data = ct.c_double()
+        low, high = 0, n
+        while low < high:
+            middle = (low + high) // 2
+            self._call(nl5.NL5_GetDataAt, self.circuit, trace_number, middle, t, data)
+            if t.value < time or (side == "right" and t.value == time):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @profiled
+    def get_trace_data(self, trace, output="pandas", start=None, end=None):
+        check_output(output)
         trace_number = self.get_trace_number(trace)
 
-        # get the data length
-        n = NL5_GetDataSize(self.circuit, trace_number)
+        first, last = self._sample_range(trace_number, start, end)
+        return self._trace_data(trace, trace_number, output, first, last)
+
+    def _sample_range(self, trace_number, start=None, end=None, margin=0):
+        # the indices of the samples between start and end, inclusive, and
+        # margin more samples on either side
+        n = self._lookup(nl5.NL5_GetDataSize, self.circuit, trace_number)
+        first, last = 0, n
+        if start is not None and start > -np.inf:
+            first = self._sample_index(trace_number, n, start)
+        if end is not None and end < np.inf:
+            last = max(first, self._sample_index(trace_number, n, end, "right"))
+        return max(first - margin, 0), min(last + margin, n)
+
+    def _trace_data(self, trace, trace_number, output, first, last):
+        n = last - first
+
+        # a single preallocated buffer per trace, which the DLL fills in place
+        if output == "structured":
+            data = np.empty(n, dtype=[("time", float), ("value", float)])
+            t, values = data["time"], data["value"]
+        else:
+            data = np.empty((2, n))
+            t, values = data
+        self._extract(nl5.get_data_arrays, 16 * n, trace_number, t, values, start=first)
+
+        # the pandas series is a view over the same buffer
+        if output == "pandas":
+            return pd.Series(values, index=t, name=trace, copy=False)
+        return data
+
+    @profiled
+    def get_trace_data_at(self, trace, times, out=None):
+        trace_number = self.get_trace_number(trace)
+
+        # the DLL interpolates between the simulated points
+        times = np.asarray(times, dtype=float)
+        if out is None:
+            out = np.empty(len(times))
+        self._extract(nl5.get_data_at_times, out.nbytes, trace_number, times, out)
 
-        # extract the data
-        data = np.empty((2, n))
-        for i in range(n):
-            data[:, i] = self.get_data_at(trace, i)
+        return out
 
-        # convert to a pandas series
-        return pd.Series(index=data[0, :], data=data[1, :], name=trace)
+    def get_time_span(self, traces):
+        # the time range covered by all of the traces
+        t = ct.c_double()
+        data = ct.c_double()
+        start, end = -np.inf, np.inf
+        for trace in traces:
+            trace_number = self.get_trace_number(trace)
+            self._call(nl5.NL5_GetDataAt, self.circuit, trace_number, 0, t, data)
+            start = max(start, t.value)
+            self._call(nl5.NL5_GetLastData, self.circuit, trace_number, t, data)
+            end = min(end, t.value)
+
+        return start, end
+
+    @profiled
+    def get_data(
+        self, traces=None, fill=True, times=None, uniform_step=None, output="pandas"
+    ):
+        check_output(output)
 
-    def get_data(self, traces=None, fill=True):
         # if no traces are specified, assume user wants all traces
         if traces is None:
             traces = self.get_trace_names()
 
-        # concatenate the data into a single DataFrame
-        data = pd.concat(
-            [self.get_trace_data(trace) for trace in traces], axis=1, sort=True
-        )
+        if uniform_step is not None:
+            start, end = self.get_time_span(traces)
+            num_points = int(np.floor((end - start) / uniform_step + 1e-9)) + 1
+            times = start + uniform_step * np.arange(num_points)
 
-        if fill:
-            data.ffill(inplace=True)
+        # sample every trace at the common times, without building a union index
+        if times is not None:
+            t = np.asarray(times, dtype=float)
 
-        return data
+            # column-major, so each trace fills a contiguous column in place
+            values = np.empty((len(t), len(traces)), order="F")
+            for i, trace in enumerate(traces):
+                self.get_trace_data_at(trace, t, out=values[:, i])
+
+        else:
+            t, values = align_traces(
+                [self.get_trace_data(trace, "numpy") for trace in traces], fill
+            )
+
+        return format_data(t, values, traces, output)
+
+    @profiled
+    def run_transient(self, screen, step, traces=None, fill=True, output="pandas"):
+        check_output(output)
+
+        # if no traces are specified, assume user wants all traces
+        if traces is None:
+            traces = self.get_trace_names()
+
+        # simulate and extract in one go, so the result can come from the cache
+        key = self._cache_key("transient", screen, step, list(traces), fill)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return format_data(cached["t"], cached["values"], traces, output)
+
+        self.simulate_transient(screen, step)
+        t, values = self.get_data(traces, fill, output="numpy")
+        if key is not None:
+            self.cache.put(key, t=t, values=values)
+
+        return format_data(t, values, traces, output)
+
+    def delete_old_data(self):
+        # drops all stored transient data except the most recent point
+        self._call(nl5.NL5_DeleteOldData, self.circuit)
+
+    def stream_transient(
+        self, total, chunk, step, traces=None, fill=True, output="pandas"
+    ):
+        check_output(output)
+
+        # if no traces are specified, assume user wants all traces
+        if traces is None:
+            traces = self.get_trace_names()
+
+        self._call(nl5.NL5_SetStep, self.circuit, step)
+        self._call(nl5.NL5_Start, self.circuit)
+
+        num_chunks = int(np.ceil(total / chunk - 1e-9))
+        end = None
+        for i in range(num_chunks):
+            self._solve(nl5.NL5_SimulateInterval, min(chunk, total - i * chunk))
+            t, values = self.get_data(traces, fill, output="numpy")
+
+            # the DLL keeps the last point of the previous chunk, so drop it to
+            # avoid repeating a row (after filling, so the fill carries over)
+            if end is not None:
+                keep = t > end
+                t, values = t[keep], values[keep]
+            if len(t):
+                end = t[-1]
+
+            # keep the memory held by the DLL bounded to a single chunk
+            self.delete_old_data()
+
+            yield format_data(t, values, traces, output)
+
+    # ---------- Measurements ----------
+    @profiled
+    def measure(self, measurements):
+        # measurements maps names to (trace, metric, window) tuples, with an
+        # optional dict of metric options, and only the windows are extracted
+        measurements = parse_measurements(measurements)
+
+        data = {}
+        results = {}
+        for name, (trace, func, window, options) in measurements.items():
+            end = self.get_last_data(trace)[0] if np.isscalar(window) else None
+            start, stop = window_bounds(window, end)
+
+            # with a sample either side of the window to interpolate from
+            key = (trace, start, stop)
+            if key not in data:
+                trace_number = self.get_trace_number(trace)
+                first, last = self._sample_range(trace_number, start, stop, 1)
+                data[key] = self._trace_data(trace, trace_number, "numpy", first, last)
+
+            metric = Window(create_metric(func, options), start, stop)
+            metric.update(*data[key])
+            results[name] = metric.value()
+
+        return results
+
+    @profiled
+    def measure_transient(self, total, chunk, step, measurements):
+        # simulates like stream_transient, reducing each chunk as it arrives so
+        # only the metrics are kept, where windows are relative to total
+        measurements = parse_measurements(measurements)
+        traces = list(dict.fromkeys(trace for trace, *_ in measurements.values()))
+
+        metrics = {}
+        columns = {}
+        for name, (trace, func, window, options) in measurements.items():
+            start, stop = window_bounds(window, total)
+            metrics[name] = Window(create_metric(func, options), start, stop)
+            columns[name] = traces.index(trace)
+
+        for t, values in self.stream_transient(
+            total, chunk, step, traces, output="numpy"
+        ):
+            for name, metric in metrics.items():
+                metric.update(t, values[:, columns[name]])
+
+        return {name: metric.value() for name, metric in metrics.items()}
 
     # ---------- AC analysis ----------
-    @check
     def set_ac_source(self, name):
-        NL5_SetACSource(self.circuit, name.encode())
+        if self._call(nl5.NL5_SetACSource, self.circuit, name.encode()) >= 0:
+            self._record(("ac_source",), "set_ac_source", name)
 
-    @check
     def add_ac_trace(self, name, trace_type="Func"):
         # map the correct trace adding function
         func = {
-            "V": NL5_AddVACTrace,
-            "I": NL5_AddIACTrace,
-            "Func": NL5_AddFuncACTrace,
+            "V": nl5.NL5_AddVACTrace,
+            "I": nl5.NL5_AddIACTrace,
+            "Func": nl5.NL5_AddFuncACTrace,
         }[trace_type]
 
-        func(self.circuit, name.encode())
+        self._ac_traces.add(self._call(func, self.circuit, name.encode()))
 
-    @check
-    def add_z_trace(self):
-        NL5_AddZACTrace(self.circuit)
+    @profiled
+    def add_ac_traces(self, names, trace_type="Func"):
+        # every trace is attempted, and any errors are raised together
+        with self.batch():
+            for name in names:
+                self.add_ac_trace(name, trace_type)
+
+    def delete_ac_trace(self, name):
+        trace_number = self.get_ac_trace_number(name)
+        if self._call(nl5.NL5_DeleteACTrace, self.circuit, trace_number) >= 0:
+            self._ac_traces.remove(trace_number)
+
+    def clear_ac_traces(self):
+        if self._call(nl5.NL5_DeleteAllACTraces, self.circuit) >= 0:
+            self._ac_traces.clear()
+
+    def add_z_trace(self, name=""):
+        self._ac_traces.add(
+            self._call(nl5.NL5_AddZACTrace, self.circuit, name.encode())
+        )
 
-    @check
     def add_gamma_trace(self):
-        NL5_AddGammaACTrace(self.circuit)
+        self._ac_traces.add(self._call(nl5.NL5_AddGammaACTrace, self.circuit))
 
-    @check
     def add_vswr_trace(self):
-        NL5_AddVSWRACTrace(self.circuit)
+        self._ac_traces.add(self._call(nl5.NL5_AddVSWRACTrace, self.circuit))
 
-    @check
     def add_loop_trace(self):
-        NL5_AddLoopACTrace(self.circuit)
+        self._ac_traces.add(self._call(nl5.NL5_AddLoopACTrace, self.circuit))
 
-    @check
+    @profiled
     def simulate_ac(self, start_frequency, stop_frequency, num_points, log_scale=True):
-        NL5_SetAC(
-            self.circuit, start_frequency, stop_frequency, num_points, int(log_scale)
+        self._call(
+            nl5.NL5_SetAC,
+            self.circuit,
+            start_frequency,
+            stop_frequency,
+            num_points,
+            int(log_scale),
         )
-        NL5_CalcAC(self.circuit)
+        self._solve(nl5.NL5_CalcAC)
+
+    def get_ac_trace_names(self, length=100):
+        return self._ac_traces.names(length)
 
-    @check
     def get_ac_trace_number(self, trace):
-        return NL5_GetACTrace(self.circuit, trace.encode())
+        return self._ac_traces.handle(trace)
 
-    @check
     def get_ac_data_at(self, trace, n):
         trace_number = self.get_ac_trace_number(trace)
 
         f = ct.c_double()
         mag = ct.c_double()
         phase = ct.c_double()
-        NL5_GetACDataAt(self.circuit, trace_number, n, f, mag, phase)
+        self._call(nl5.NL5_GetACDataAt, self.circuit, trace_number, n, f, mag, phase)
 
         return f.value, mag.value, phase.value
 
-    @check
-    def get_ac_trace_data(self, trace):
+    @profiled
+    def get_ac_trace_arrays(self, trace):
         trace_number = self.get_ac_trace_number(trace)
 
         # get the data length
-        n = NL5_GetACDataSize(self.circuit, trace_number)
-
-        # extract the data
-        data = np.empty((3, n))
-        for i in range(n):
-            data[:, i] = self.get_ac_data_at(trace, i)
-
-        # convert to a dataframe with a hierarchical index
-        df = pd.concat(
-            {
-                trace: pd.DataFrame(
-                    index=data[0, :],
-                    data={"magnitude": data[1, :], "phase": data[2, :]},
-                )
-            },
-            axis=1,
+        n = self._lookup(nl5.NL5_GetACDataSize, self.circuit, trace_number)
+
+        # extract the data straight into preallocated buffers
+        f = np.empty(n)
+        mag = np.empty(n)
+        phase = np.empty(n)
+        self._extract(nl5.get_ac_data_arrays, 24 * n, trace_number, f, mag, phase)
+
+        return f, mag, phase
+
+    def get_ac_trace_data(self, trace, as_complex=False):
+        return self.get_ac_data([trace], as_complex)
+
+    @profiled
+    def get_ac_data(self, traces, as_complex=False):
+        arrays = [self.get_ac_trace_arrays(trace) for trace in traces]
+        return ac_data_frame(traces, arrays, as_complex)
+
+    @profiled
+    def run_ac(
+        self,
+        start_frequency,
+        stop_frequency,
+        num_points,
+        traces,
+        log_scale=True,
+        as_complex=False,
+    ):
+        # simulate and extract in one go, so the result can come from the cache
+        settings = ("ac", start_frequency, stop_frequency, num_points, log_scale)
+        key = self._cache_key(settings, list(traces))
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            arrays = [
+                (cached[f"f{i}"], cached[f"mag{i}"], cached[f"phase{i}"])
+                for i in range(len(traces))
+            ]
+            return ac_data_frame(traces, arrays, as_complex)
+
+        self.simulate_ac(start_frequency, stop_frequency, num_points, log_scale)
+        arrays = [self.get_ac_trace_arrays(trace) for trace in traces]
+        if key is not None:
+            self.cache.put(
+                key,
+                **{
+                    f"{name}{i}": array
+                    for i, trace_arrays in enumerate(arrays)
+                    for name, array in zip(("f", "mag", "phase"), trace_arrays)
+                },
+            )
+
+        return ac_data_frame(traces, arrays, as_complex)
+
+    # ---------- Data export ----------
+    @profiled
+    def export_data(self, path, traces=None, format="nl5"):
+        # "nl5" is the DLL's own format and always holds every trace, while
+        # "npy" writes a directory with one memory-mappable file per trace
+        if format == "nl5":
+            if traces is not None:
+                raise ValueError("the nl5 format always contains every trace")
+
+            # the DLL silently writes nothing to a path without an extension
+            if not os.path.splitext(path)[1]:
+                path += ".nlt"
+            self._call(nl5.NL5_SaveData, self.circuit, path.encode())
+        elif format == "npy":
+            from .store import export_npy
+
+            if traces is None:
+                traces = self.get_trace_names()
+            export_npy(self, path, traces, "transient")
+        else:
+            raise ValueError(f"unknown format {format!r}")
+
+        return path
+
+    @profiled
+    def export_ac_data(self, path, traces=None, format="nl5"):
+        if format == "nl5":
+            if traces is not None:
+                raise ValueError("the nl5 format always contains every trace")
+
+            # the DLL silently writes nothing to a path without an extension
+            if not os.path.splitext(path)[1]:
+                path += ".nlf"
+            self._call(nl5.NL5_SaveACData, self.circuit, path.encode())
+        elif format == "npy":
+            from .store import export_npy
+
+            if traces is None:
+                traces = self.get_ac_trace_names()
+            export_npy(self, path, traces, "ac")
+        else:
+            raise ValueError(f"unknown format {format!r}")
+
+        return path
+
+    # ---------- Parameter sweeps ----------
+    def sweep(
+        self,
+        param_grid,
+        traces,
+        screen,
+        step,
+        workers=None,
+        reduce=None,
+        validate=True,
+    ):
+        # imported here since the sweep workers themselves create schematics
+        from .sweep import run_sweep, grid_points
+
+        # fail straight away, rather than in every worker, if a point names a
+        # component which isn't in the file
+        points = grid_points(param_grid)
+        if validate:
+            self.index.validate(
+                list({name: None for point in points for name in point})
+            )
+
+        return run_sweep(self, points, traces, screen, step, workers, reduce)
+
+    def monte_carlo(
+        self,
+        tolerances,
+        traces,
+        screen,
+        step,
+        metric,
+        passes=None,
+        percentiles=(),
+        samples=10_000,
+        method="lhs",
+        batch=100,
+        yield_ci=None,
+        percentile_ci=None,
+        confidence=0.95,
+        workers=None,
+        seed=None,
+        validate=True,
+    ):
+        from .montecarlo import run_monte_carlo
+
+        if validate:
+            self.index.validate(list(tolerances))
+
+        return run_monte_carlo(
+            self,
+            tolerances,
+            traces,
+            screen,
+            step,
+            metric,
+            passes,
+            percentiles,
+            samples,
+            method,
+            batch,
+            yield_ci,
+            percentile_ci,
+            confidence,
+            workers,
+            seed,
         )
 
-        return df
+    def find_boundary(
+        self,
+        name,
+        low,
+        high,
+        traces,
+        screen,
+        step,
+        metric,
+        xtol=None,
+        method="brent",
+        maxiter=50,
+        evaluations=None,
+        validate=True,
+    ):
+        # the value of name between low and high at which metric(data) changes
+        # sign, found with as few simulations as the margin allows
+        if validate:
+            self.index.validate([name])
+        return find_boundary(
+            self,
+            name,
+            low,
+            high,
+            traces,
+            screen,
+            step,
+            metric,
+            xtol,
+            method,
+            maxiter,
+            evaluations,
+        )
 
-    @check
-    def get_ac_data(self, traces):
-        return pd.concat(
-            [self.get_ac_trace_data(trace) for trace in traces], axis=1, sort=True
-        ).ffill()
+    def map_boundary(
+        self,
+        ranges,
+        traces,
+        screen,
+        step,
+        metric,
+        points=5,
+        levels=3,
+        evaluations=None,
+        validate=True,
+    ):
+        # the passing points at the edge of the region where metric(data) is
+        # not negative, over name -> (low, high) ranges
+        if validate:
+            self.index.validate(list(ranges))
+        return map_boundary(
+            self, ranges, traces, screen, step, metric, points, levels, evaluations
+        )
 
     # ---------- File ops ----------
-    @check
     def save(self):
-        NL5_Save(self.circuit)
+        self._call(nl5.NL5_Save, self.circuit)
 
-    @check
     def saveas(self, filename):
-        NL5_SaveAs(self.circuit, filename.encode())
+        self._call(nl5.NL5_SaveAs, self.circuit, filename.encode())
+
+    # ---------- Copies ----------
+    def _template_path(self):
+        # the state is saved once, and copies are opened from that file for as
+        # long as no further edits are made
+        if self._template is not None and self._template[0] == self._revision:
+            return self._template[1]
+
+        self._remove_template()
+        path = _temporary_file()
+        try:
+            self.saveas(path)
+        except Exception:
+            _remove(path)
+            raise
+        self._template = (self._revision, path)
+        return path
+
+    def _remove_template(self):
+        if self._template is not None:
+            _remove(self._template[1])
+            self._template = None
+
+    def clone(self, cache=None, profiler=None):
+        # an independent circuit with the edits and traces of this one, which
+        # shares its cache and profiler unless others are given
+        copy = Schematic(
+            self._template_path(),
+            self.cache if cache is None else cache,
+            self.profiler if profiler is None else profiler,
+        )
+        try:
+            copy.filename = self.filename
+            copy._index = self._index
+
+            # only some traces are loaded from a saved file, so they are set up
+            # again to match this one, with the samples of any Data traces
+            copy.clear_traces()
+            with copy.batch():
+                for name in self.get_trace_names():
+                    data = self._changes.get(("data trace", name.lower()))
+                    if data is None:
+                        copy.add_trace(name)
+                    else:
+                        copy.load_data_trace(*data[1])
+            copy.clear_ac_traces()
+            copy.add_ac_traces(self.get_ac_trace_names())
+
+            # the copy stands in for the original file in cache keys, and in
+            # the edits replayed by sweep workers
+            copy._changes = dict(self._changes)
+        except Exception:
+            copy.close()
+            raise
+        return copy
+
+    def to_bytes(self):
+        # the contents of the circuit as an .nl5 file, including unsaved edits
+        with open(self._template_path(), "rb") as f:
+            return f.read()
+
+    @classmethod
+    def from_bytes(cls, data, cache=None, profiler=None):
+        # a schematic opened from the contents of an .nl5 file, through a
+        # temporary file which is kept until it is closed
+        path = _temporary_file()
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+            schematic = cls(path, cache, profiler)
+        except Exception:
+            _remove(path)
+            raise
+        schematic._temporary = path
+        return schematic
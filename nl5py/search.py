@@ -0,0 +1,269 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import itertools
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Searches evaluate a margin, metric(data) of the get_data frame of a
+# simulation, which is zero or positive while the spec is met and negative
+# once it fails. Margins are kept by point in an evaluations dict, so a
+# point is never simulated twice, and a dict from an earlier search can be
+# passed to the next one.
+
+# the boundary of a single parameter, where value is the passing end of the
+# final (passing, failing) bracket
+BoundaryResult = namedtuple(
+    "BoundaryResult", ["value", "bracket", "evaluations", "converged"]
+)
+
+# the boundary of several parameters, where samples holds every point that
+# was simulated, and boundary the passing points next to a failing one
+BoundaryMap = namedtuple("BoundaryMap", ["samples", "boundary"])
+
+
+class _Margin:
+    # simulates each point once, restoring the parameters when closed
+    def __init__(self, schematic, names, traces, screen, step, metric, evaluations):
+        self.schematic = schematic
+        self.names = names
+        self.traces = traces
+        self.screen = screen
+        self.step = step
+        self.metric = metric
+        self.evaluations = {} if evaluations is None else evaluations
+        self.original = schematic.get_values(names)
+
+    def __call__(self, point):
+        try:
+            return self.evaluations[point]
+        except KeyError:
+            pass
+
+        values = point if isinstance(point, tuple) else (point,)
+        for name, value in zip(self.names, values):
+            self.schematic.set_value(name, value)
+        data = self.schematic.run_transient(self.screen, self.step, self.traces)
+
+        margin = self.evaluations[point] = float(self.metric(data))
+        return margin
+
+    def close(self):
+        self.schematic.set_values(self.original)
+
+
+def _bracket(margin, low, high):
+    # the narrowest bracket around the sign change closest to low, from what
+    # has been evaluated so far
+    known = sorted(
+        x for x in margin.evaluations if not isinstance(x, tuple) and low < x < high
+    )
+    points = [low] + known + [high]
+    passes = [margin(x) >= 0 for x in points]
+    if passes[0] == passes[-1]:
+        raise ValueError(
+            f"{margin.names[0]} {'passes' if passes[0] else 'fails'} at both "
+            f"{low} and {high}"
+        )
+
+    for i in range(len(points) - 1):
+        if passes[i] != passes[i + 1]:
+            return points[i], points[i + 1]
+
+
+def brent(f, a, b, xtol, maxiter):
+    # Brent's method for the sign change of f between a and b, which combines
+    # inverse quadratic interpolation with bisection, so it converges like the
+    # former on smooth margins and no slower than the latter on steps, and
+    # returns the final (current, opposite) bracket and whether it converged
+    xpre, xcur = a, b
+    fpre, fcur = f(a), f(b)
+    xblk, fblk = xpre, fpre
+    spre = scur = xcur - xpre
+
+    for _ in range(maxiter):
+        if fpre != 0 and fcur != 0 and (fpre < 0) != (fcur < 0):
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+
+        delta = xtol / 2
+        sbis = (xblk - xcur) / 2
+        if fcur == 0 or abs(sbis) < delta:
+            return (xcur, xblk), True
+
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                # secant
+                stry = -fcur * (xcur - xpre) / (fcur - fpre)
+            else:
+                # inverse quadratic interpolation
+                dpre = (fpre - fcur) / (xpre - xcur)
+                dblk = (fblk - fcur) / (xblk - xcur)
+                stry = (
+                    -fcur * (fblk * dblk - fpre * dpre) / (dblk * dpre * (fblk - fpre))
+                )
+            if 2 * abs(stry) < min(abs(spre), 3 * abs(sbis) - delta):
+                spre, scur = scur, stry
+            else:
+                spre = scur = sbis
+        else:
+            spre = scur = sbis
+
+        xpre, fpre = xcur, fcur
+        if abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = f(xcur)
+
+    # the last step may have crossed the sign change
+    if (fcur < 0) != (fpre < 0):
+        return (xcur, xpre), False
+    return (xcur, xblk), False
+
+
+def bisect(f, a, b, xtol, maxiter):
+    # halves the bracket on the sign of f alone, for margins that are only
+    # pass/fail
+    fa = f(a)
+    for _ in range(maxiter):
+        if abs(b - a) <= xtol:
+            return (a, b), True
+        mid = (a + b) / 2
+        if (f(mid) >= 0) == (fa >= 0):
+            a = mid
+        else:
+            b = mid
+    return (a, b), abs(b - a) <= xtol
+
+
+def find_boundary(
+    schematic,
+    name,
+    low,
+    high,
+    traces,
+    screen,
+    step,
+    metric,
+    xtol=None,
+    method="brent",
+    maxiter=50,
+    evaluations=None,
+):
+    if method not in ("brent", "bisect"):
+        raise ValueError(f"unknown search method {method!r}")
+    if xtol is None:
+        xtol = 1e-3 * abs(high - low)
+
+    margin = _Margin(schematic, [name], traces, screen, step, metric, evaluations)
+    try:
+        a, b = _bracket(margin, low, high)
+        search = brent if method == "brent" else bisect
+        bracket, converged = search(margin, a, b, xtol, maxiter)
+    finally:
+        margin.close()
+
+    # the points are ordered (passing, failing)
+    if margin(bracket[0]) < 0:
+        bracket = bracket[::-1]
+    return BoundaryResult(bracket[0], bracket, margin.evaluations, converged)
+
+
+def _axis(low, high, points, levels):
+    # values of the finest grid, of which the coarse one is every 2**levels,
+    # computed so that a point has exactly the same value at every level
+    intervals = (points - 1) * 2**levels
+    return low + (high - low) * (np.arange(intervals + 1) / intervals)
+
+
+def map_boundary(
+    schematic,
+    ranges,
+    traces,
+    screen,
+    step,
+    metric,
+    points=5,
+    levels=3,
+    evaluations=None,
+):
+    # starts from a coarse grid of points per parameter, and subdivides only
+    # the cells with both passing and failing corners, levels times
+    names = list(ranges)
+    if np.isscalar(points):
+        points = {name: points for name in names}
+    axes = [_axis(*ranges[name], points[name], levels) for name in names]
+
+    margin = _Margin(schematic, names, traces, screen, step, metric, evaluations)
+
+    def evaluate(index):
+        return margin(tuple(float(axis[i]) for axis, i in zip(axes, index)))
+
+    def corners(cell, size):
+        return itertools.product(*[(i, i + size) for i in cell])
+
+    try:
+        size = 2**levels
+        cells = list(
+            itertools.product(*[range(0, len(axis) - 1, size) for axis in axes])
+        )
+        while cells:
+            mixed = [
+                cell
+                for cell in cells
+                if len({evaluate(corner) >= 0 for corner in corners(cell, size)}) > 1
+            ]
+            if size == 1:
+                break
+
+            size //= 2
+            cells = [
+                tuple(i + offset for i, offset in zip(cell, offsets))
+                for cell in mixed
+                for offsets in itertools.product((0, size), repeat=len(names))
+            ]
+    finally:
+        margin.close()
+
+    # the evaluations of this grid, by grid index
+    grid = {}
+    for index in itertools.product(*[range(len(axis)) for axis in axes]):
+        point = tuple(float(axis[i]) for axis, i in zip(axes, index))
+        if point in margin.evaluations:
+            grid[index] = margin.evaluations[point]
+
+    rows = [
+        dict(zip(names, (axis[i] for axis, i in zip(axes, index))), margin=value)
+        for index, value in grid.items()
+    ]
+    samples = pd.DataFrame(rows, columns=names + ["margin"])
+    samples["passed"] = samples["margin"] >= 0
+
+    # passing points with a failing neighbour on the finest grid
+    boundary = [
+        any(
+            grid.get(index[:d] + (index[d] + offset,) + index[d + 1 :], 0) < 0
+            for d in range(len(names))
+            for offset in (-1, 1)
+        )
+        for index, value in grid.items()
+        if value >= 0
+    ]
+    passing = samples[samples["passed"]]
+    return BoundaryMap(samples, passing[boundary].reset_index(drop=True))
@@ -0,0 +1,146 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import os
+import json
+import numpy as np
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote_plus
+from .nl5_dll import commands as nl5
+from .schematic import align_traces, format_data, ac_data_frame, check_output
+
+# rows per sample in each kind of data: (t, value) or (f, magnitude, phase)
+ROWS = {"transient": 2, "ac": 3}
+
+# root tags of the files written by NL5_SaveData and NL5_SaveACData
+ROOT_TAGS = {b"</NL5_tran>": "transient", b"</NL5_freq>": "ac"}
+
+
+def export_npy(schematic, path, traces, kind):
+    # one (rows, n) .npy file per trace, which the DLL fills through a memory
+    # map so the data never has to fit in RAM
+    os.makedirs(path, exist_ok=True)
+
+    index = {"kind": kind, "traces": []}
+    for i, trace in enumerate(traces):
+        filename = f"{i}.npy"
+        if kind == "transient":
+            trace_number = schematic.get_trace_number(trace)
+            n = schematic._lookup(nl5.NL5_GetDataSize, schematic.circuit, trace_number)
+        else:
+            trace_number = schematic.get_ac_trace_number(trace)
+            n = schematic._lookup(
+                nl5.NL5_GetACDataSize, schematic.circuit, trace_number
+            )
+
+        data = np.lib.format.open_memmap(
+            os.path.join(path, filename), mode="w+", shape=(ROWS[kind], n)
+        )
+        if kind == "transient":
+            func = nl5.get_data_arrays
+        else:
+            func = nl5.get_ac_data_arrays
+        code, error = func(schematic.circuit, trace_number, *data)
+        data.flush()
+        del data
+        schematic._check(code, error)
+
+        index["traces"].append({"name": trace, "file": filename})
+
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def _read_nl5_header(path, block_size=1 << 16):
+    # the XML header is followed by a null byte and then the binary data
+    with open(path, "rb") as f:
+        header = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                raise ValueError(f"{path} is not an NL5 data file")
+            header += block
+            for tag, kind in ROOT_TAGS.items():
+                end = header.find(tag)
+                if end >= 0:
+                    end += len(tag)
+                    return ET.fromstring(header[:end]), kind, end + 1
+
+
+def _trace_name(element):
+    # saved traces are named after their expression, prefixed with "Copy of"
+    name = element.get("name") or unquote_plus(element.get("expr", ""))
+    if name.startswith("Copy of "):
+        name = name[len("Copy of ") :]
+    return name
+
+
+class TraceStore:
+    # read-only, memory-mapped view of data saved with Schematic.export_data or
+    # Schematic.export_ac_data, where each trace is a (rows, n) array
+    def __init__(self, path):
+        self.path = path
+        self._traces = {}
+
+        if os.path.isdir(path):
+            with open(os.path.join(path, "index.json")) as f:
+                index = json.load(f)
+            self.kind = index["kind"]
+            for entry in index["traces"]:
+                self._traces[entry["name"]] = np.load(
+                    os.path.join(path, entry["file"]), mmap_mode="r"
+                )
+            return
+
+        root, self.kind, offset = _read_nl5_header(path)
+        rows = ROWS[self.kind]
+        for element in root.iter("Trace"):
+            size = int(element.get("size"))
+            self._traces[_trace_name(element)] = np.memmap(
+                path, dtype="<f8", mode="r", offset=offset, shape=(size, rows)
+            ).T
+            offset += 8 * rows * size
+
+    @property
+    def names(self):
+        return list(self._traces)
+
+    def __len__(self):
+        return len(self._traces)
+
+    def __contains__(self, trace):
+        return trace in self._traces
+
+    def __getitem__(self, trace):
+        return self._traces[trace]
+
+    def get_data(self, traces=None, fill=True, output="pandas"):
+        check_output(output)
+        if traces is None:
+            traces = self.names
+
+        t, values = align_traces([self[trace] for trace in traces], fill)
+        return format_data(t, values, traces, output)
+
+    def get_ac_data(self, traces=None, as_complex=False):
+        if traces is None:
+            traces = self.names
+
+        return ac_data_frame(
+            traces, [tuple(self[trace]) for trace in traces], as_complex
+        )
+
+
+def load_data(path):
+    return TraceStore(path)
@@ -0,0 +1,127 @@
+# Copyright 2024 Enphase Energy, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .nl5_dll import commands
+from .schematic import Schematic
+
+# a single sweep point, where exactly one of result/error is set
+SweepResult = namedtuple("SweepResult", ["index", "params", "result", "error"])
+
+# the schematic owned by a worker process, opened once by the initializer
+_schematic = None
+
+# values of the swept parameters before any point set them, by name
+_originals = {}
+
+
+def grid_points(param_grid):
+    # a dict of name -> values is expanded into its Cartesian product, anything
+    # else is treated as an iterable of {name: value} points
+    if isinstance(param_grid, dict):
+        names = list(param_grid)
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*param_grid.values())
+        ]
+    return [dict(point) for point in param_grid]
+
+
+def _set(name, value):
+    if isinstance(value, str):
+        _schematic.set_text(name, value)
+    else:
+        _schematic.set_value(name, value)
+
+
+def _init_worker(filename, license_file, changes, traces, names):
+    global _schematic, _originals
+
+    if license_file is not None:
+        commands.load_license(license_file)
+
+    _schematic = Schematic(filename)
+    _schematic._replay(changes)
+
+    existing = _schematic.get_trace_names()
+    _schematic.add_traces([trace for trace in traces if trace not in existing])
+
+    # names -> whether any point sets it as text, and a parameter that can't
+    # be read is left out, since every point that sets it fails anyway
+    _originals = {}
+    for name, text in names.items():
+        try:
+            if text:
+                _originals[name] = _schematic.get_text(name)
+            else:
+                _originals[name] = _schematic.get_value(name)
+        except Exception:
+            pass
+
+
+def _run_point(index, params, traces, screen, step, reduce):
+    try:
+        # every point starts from the same values, whichever points this
+        # worker ran before, including any that failed part way through
+        for name, value in _originals.items():
+            _set(name, value)
+        for name, value in params.items():
+            _set(name, value)
+
+        _schematic.simulate_transient(screen, step)
+        result = _schematic.get_data(traces)
+        if reduce is not None:
+            result = reduce(result)
+
+        return SweepResult(index, params, result, None)
+
+    # a failing point is reported back instead of stopping the whole sweep
+    except Exception as error:
+        return SweepResult(index, params, None, error)
+
+
+def run_sweep(schematic, param_grid, traces, screen, step, workers=None, reduce=None):
+    points = grid_points(param_grid)
+
+    names = {}
+    for point in points:
+        for name, value in point.items():
+            names[name] = names.get(name, False) or isinstance(value, str)
+
+    initargs = (
+        schematic.filename,
+        commands._license_file,
+        list(schematic._changes.values()),
+        list(traces),
+        names,
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as executor:
+        futures = [
+            executor.submit(_run_point, index, params, traces, screen, step, reduce)
+            for index, params in enumerate(points)
+        ]
+
+        # stream results back in completion order, dropping queued points if
+        # the caller stops iterating early
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
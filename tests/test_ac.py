@@ -0,0 +1,73 @@
+import pytest
+from nl5py import Schematic, load_data
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+
+def setup_module():
+    schematic.set_value("C1", 1e-9)
+    schematic.set_value("R1", 1e3)
+    schematic.set_ac_source("V1")
+    schematic.add_ac_trace("C1", "V")
+    schematic.add_ac_trace("V(C1)*2")
+    schematic.simulate_ac(start_frequency=1e3, stop_frequency=1e6, num_points=500)
+
+
+def test_ac_trace_names():
+    assert schematic.get_ac_trace_names() == ["V(C1)", "V(C1)*2"]
+    assert schematic.get_ac_trace_number("V(C1)*2") != schematic.get_ac_trace_number(
+        "V(C1)"
+    )
+
+
+def test_add_clear_ac_traces():
+    other = Schematic(schematic_file)
+    other.add_ac_traces(["C1", "R1"], "V")
+    other.add_ac_traces(["V(C1)*2"])
+    assert other.get_ac_trace_names() == ["V(C1)", "V(R1)", "V(C1)*2"]
+
+    other.delete_ac_trace("V(R1)")
+    assert other.get_ac_trace_names() == ["V(C1)", "V(C1)*2"]
+
+    with pytest.raises(Exception, match="C2"):
+        other.add_ac_traces(["C2"], "V")
+
+    other.clear_ac_traces()
+    assert other.get_ac_trace_names() == []
+
+
+def test_ac_data():
+    data = schematic.get_ac_data(["V(C1)", "V(C1)*2"])
+    assert list(data.columns) == [
+        ("V(C1)", "magnitude"),
+        ("V(C1)", "phase"),
+        ("V(C1)*2", "magnitude"),
+        ("V(C1)*2", "phase"),
+    ]
+    assert np.allclose(data["V(C1)*2"]["magnitude"], 2 * data["V(C1)"]["magnitude"])
+
+    # spot check the bulk path against the per-point accessor
+    for n in [0, 250, len(data) - 1]:
+        f, mag, phase = schematic.get_ac_data_at("V(C1)", n)
+        assert data.index[n] == f
+        assert data["V(C1)"]["magnitude"].iloc[n] == mag
+        assert data["V(C1)"]["phase"].iloc[n] == phase
+
+
+def test_complex_ac_data():
+    data = schematic.get_ac_data(["V(C1)"])
+    values = schematic.get_ac_data(["V(C1)"], as_complex=True)["V(C1)"]
+    assert np.allclose(np.abs(values), data["V(C1)"]["magnitude"])
+    assert np.allclose(np.degrees(np.angle(values)), data["V(C1)"]["phase"])
+
+
+@pytest.mark.parametrize("format", ["nl5", "npy"])
+def test_export_ac_data(tmp_path, format):
+    path = str(tmp_path / "ac_data")
+    store = load_data(schematic.export_ac_data(path, format=format))
+    assert store.names == ["V(C1)", "V(C1)*2"]
+    assert store.get_ac_data().equals(schematic.get_ac_data(["V(C1)", "V(C1)*2"]))
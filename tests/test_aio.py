@@ -0,0 +1,120 @@
+import pytest
+from nl5py import AsyncSchematic, Schematic, aio
+
+import os
+import asyncio
+import threading
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+
+
+async def open_rc():
+    schematic = await AsyncSchematic(schematic_file).open()
+    await schematic.set_value("V1", 1)
+    await schematic.set_value("C1", 1)
+    await schematic.set_value("R1", 1)
+    await schematic.set_value("C1.IC", 0)
+    await schematic.clear_traces()
+    await schematic.add_trace("V(C1)")
+    return schematic
+
+
+def test_simulate_transient():
+    async def run():
+        async with await open_rc() as schematic:
+            updates = []
+            await schematic.simulate_transient(
+                screen=1,
+                step=1e-3,
+                chunk=0.25,
+                progress=lambda t, total: updates.append((t, total)),
+            )
+            data = await schematic.get_trace_data("V(C1)")
+            return updates, data
+
+    updates, data = asyncio.run(run())
+    assert [total for _, total in updates] == [1] * 4
+    assert [t for t, _ in updates] == pytest.approx([0.25, 0.5, 0.75, 1])
+    assert 0.631 < data.iloc[-1] < 0.634
+
+
+def test_concurrent_simulations():
+    async def run():
+        schematics = [await open_rc() for _ in range(3)]
+        for schematic, r in zip(schematics, [0.5, 1, 2]):
+            await schematic.set_value("R1", r)
+
+        await asyncio.gather(
+            *[
+                schematic.simulate_transient(screen=1, step=1e-3)
+                for schematic in schematics
+            ]
+        )
+        values = [
+            (await schematic.get_trace_data("V(C1)")).iloc[-1]
+            for schematic in schematics
+        ]
+        for schematic in schematics:
+            await schematic.close()
+        return values
+
+    values = asyncio.run(run())
+    assert values[0] > values[1] > values[2]
+
+
+def test_cancel():
+    async def run():
+        async with await open_rc() as schematic:
+            task = asyncio.create_task(
+                schematic.simulate_transient(screen=100, step=1e-5, chunk=0.1)
+            )
+
+            # let a few chunks run, then cancel between them
+            while schematic.simulation_time < 0.2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            # the worker is free again, and the simulation stopped early
+            await schematic.get_value("R1")
+            return schematic.simulation_time
+
+    assert asyncio.run(run()) < 100
+
+
+def test_timeout():
+    async def run():
+        async with await open_rc() as schematic:
+            await schematic.set_timeout(30)
+            with pytest.raises(asyncio.TimeoutError):
+                await schematic.simulate_transient(
+                    screen=100, step=1e-5, chunk=0.1, timeout=0.5
+                )
+            return schematic.schematic._timeout
+
+    # the timeout of the schematic is put back afterwards
+    assert asyncio.run(run()) == 30
+
+
+def test_open(monkeypatch):
+    threads = []
+
+    def schematic(*args):
+        threads.append(threading.current_thread())
+        return Schematic(*args)
+
+    monkeypatch.setattr(aio, "Schematic", schematic)
+
+    async def run():
+        schematic = AsyncSchematic(schematic_file)
+        assert schematic.schematic is None
+        with pytest.raises(AttributeError, match="opened"):
+            schematic.get_value
+
+        # the circuit is opened on the worker thread, not the event loop's
+        async with schematic:
+            return await schematic.get_value("R1")
+
+    assert asyncio.run(run()) == 1000
+    assert threads and threads[0] is not threading.current_thread()
@@ -0,0 +1,74 @@
+import pytest
+from nl5py import Schematic, ResultCache
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+
+
+def test_transient_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    schematic = Schematic(schematic_file, cache=cache)
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.add_trace("V(C1)")
+
+    data = schematic.run_transient(screen=1, step=1e-3)
+    assert len(cache.entries()) == 1
+
+    # a hit must not touch the DLL
+    def fail(*args, **kwargs):
+        raise AssertionError("simulated on a cache hit")
+
+    simulate_transient = schematic.simulate_transient
+    schematic.simulate_transient = fail
+    cached = schematic.run_transient(screen=1, step=1e-3)
+    assert cached.equals(data)
+
+    # a different parameter set is a miss
+    schematic.simulate_transient = simulate_transient
+    schematic.set_value("R1", 2)
+    changed = schematic.run_transient(screen=1, step=1e-3)
+    assert changed["V(C1)"].iloc[-1] < data["V(C1)"].iloc[-1]
+    assert len(cache.entries()) == 2
+
+    # the same edits made in a new process give the same key
+    other = Schematic(schematic_file, cache=cache)
+    for name, value in [("V1", 1), ("C1", 1), ("R1", 1), ("C1.IC", 0)]:
+        other.set_value(name, value)
+    other.simulate_transient = fail
+    assert other.run_transient(1, 1e-3, traces=["V(C1)"]).equals(data)
+
+
+def test_ac_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    schematic = Schematic(schematic_file, cache=cache)
+    schematic.set_ac_source("V1")
+    schematic.add_ac_trace("C1", "V")
+
+    data = schematic.run_ac(1e3, 1e6, 100, traces=["V(C1)"])
+    schematic.simulate_ac = None
+    assert schematic.run_ac(1e3, 1e6, 100, traces=["V(C1)"]).equals(data)
+
+
+def test_cache_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for i in range(5):
+        cache.put(f"key{i}", values=np.zeros(100))
+        os.utime(os.path.join(str(tmp_path), f"key{i}.npz"), ns=(i, i))
+
+    # reading an entry makes it the most recently used
+    assert cache.get("key0") is not None
+
+    entry_size = cache.size() // 5
+    cache.max_size = 3 * entry_size
+    cache.evict()
+
+    assert cache.size() <= 3 * entry_size
+    assert cache.get("key0") is not None
+    assert cache.get("key1") is None
+    assert cache.get("key2") is None
+    assert cache.get("key4") is not None
@@ -0,0 +1,102 @@
+import pytest
+from nl5py import Schematic, SchematicPool
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+
+
+def final_value(schematic):
+    schematic.simulate_transient(screen=1, step=1e-3)
+    return schematic.get_trace_data("V(C1)").iloc[-1]
+
+
+def edited():
+    schematic = Schematic(schematic_file)
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.set_value("R1", 2)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    return schematic
+
+
+def test_clone():
+    with edited() as schematic, schematic.clone() as copy:
+        assert copy.circuit != schematic.circuit
+        assert copy.filename == schematic.filename
+        assert copy.get_value("R1") == 2
+        assert copy.get_trace_names() == ["V(C1)"]
+        assert copy._changes == schematic._changes
+        assert final_value(copy) == final_value(schematic)
+
+        # the copies are independent of each other
+        copy.set_value("R1", 1)
+        assert schematic.get_value("R1") == 2
+        assert final_value(copy) > final_value(schematic)
+
+
+def test_template():
+    with edited() as schematic:
+        with schematic.clone(), schematic.clone():
+            pass
+        path = schematic._template[1]
+        assert os.path.exists(path)
+
+        # the saved state is reused until there are further edits
+        with schematic.clone():
+            assert schematic._template[1] == path
+        schematic.set_value("R1", 5)
+        with schematic.clone() as copy:
+            assert copy.get_value("R1") == 5
+        assert schematic._template[1] != path
+        assert not os.path.exists(path)
+
+        path = schematic._template[1]
+    assert not os.path.exists(path)
+
+
+def test_bytes():
+    with edited() as schematic:
+        data = schematic.to_bytes()
+
+    with Schematic.from_bytes(data) as copy:
+        path = copy.filename
+        assert copy.get_value("R1") == 2
+        assert copy.index["R1"].type == "R_R"
+
+        with pytest.raises(Exception, match="C2"):
+            copy.set_value("C2", 1)
+    assert not os.path.exists(path)
+
+
+def test_pool_from_schematic():
+    with edited() as schematic:
+        expected = final_value(schematic)
+        with SchematicPool(schematic, 3) as pool:
+            assert pool.filename == schematic_file
+            assert schematic not in pool._schematics
+            assert (
+                list(pool.map(lambda copy, _: final_value(copy), range(3)))
+                == [expected] * 3
+            )
+        assert schematic.circuit is not None
+
+
+def test_clone_data_trace(tmp_path):
+    with edited() as schematic:
+        t = np.linspace(0, 1, 101)
+        schematic.load_data_trace("stimulus", t, np.sin(t))
+
+        # the Data trace is loaded again with its samples, not as a function
+        with schematic.clone() as copy:
+            assert copy.get_trace_names() == ["V(C1)", "stimulus"]
+            assert copy._changes.keys() == schematic._changes.keys()
+            saved = str(tmp_path / "copy.nl5")
+            copy.saveas(saved)
+            with open(saved) as f:
+                traces = f.read()
+            assert 'expr="stimulus"' in traces.split('type="Data"')[0]
+            assert 'expr="V(C1)"' in traces.split('type="Function"')[0]
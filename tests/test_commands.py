@@ -0,0 +1,38 @@
+import pytest
+from nl5py.nl5_dll import commands
+
+import os
+import re
+import ctypes as ct
+
+header_file = os.path.join(os.path.dirname(commands.__file__), "Windows", "nl5_dll.h")
+
+# map the C types used in nl5_dll.h onto their ctypes equivalents
+c_types = {
+    "int": ct.c_int,
+    "double": ct.c_double,
+    "char*": ct.c_char_p,
+    "int*": ct.POINTER(ct.c_int),
+    "double*": ct.POINTER(ct.c_double),
+}
+
+
+def get_prototypes():
+    with open(header_file) as f:
+        header = f.read()
+
+    pattern = re.compile(r"IMP_EXP\s+([\w\*]+)\s+(NL5_\w+)\((.*?)\);")
+    for restype, name, args in pattern.findall(header):
+        argtypes = [
+            c_types[arg.rsplit(" ", 1)[0].replace(" ", "")]
+            for arg in args.split(",")
+            if arg.strip()
+        ]
+        yield name, c_types[restype], argtypes
+
+
+@pytest.mark.parametrize("name, restype, argtypes", list(get_prototypes()))
+def test_prototypes_match_header(name, restype, argtypes):
+    func = getattr(commands, name)
+    assert func.restype is restype
+    assert list(func.argtypes) == argtypes
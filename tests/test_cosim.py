@@ -0,0 +1,71 @@
+import pytest
+from nl5py import Schematic
+from nl5py.nl5_dll import commands as nl5
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "cosim.nl5")
+schematic = Schematic(schematic_file)
+
+
+def test_inputs_outputs():
+    assert schematic.get_input("V1") == schematic.get_input("V1")
+
+    with pytest.raises(Exception, match="cannot be an input"):
+        schematic.get_input("C1")
+    with pytest.raises(Exception, match="cannot be an output"):
+        schematic.get_output("V1")
+
+    cosim = schematic.cosim(["V1"], ["VM1"])
+    cosim.start(1e-3)
+    schematic.set_input("V1", 1)
+    for _ in range(1000):
+        schematic.simulate_step()
+
+    assert 0.631 < schematic.get_output_value("VM1") < 0.634
+    assert cosim.get_outputs() == [schematic.get_output_value("VM1")]
+
+
+def test_step():
+    cosim = schematic.cosim(["V1"], ["VM1"])
+    cosim.start(1e-3)
+    outputs = cosim.step([1])
+    for _ in range(999):
+        outputs = cosim.step()
+
+    assert 0.631 < outputs[0] < 0.634
+    assert cosim.time == pytest.approx(1, abs=2e-3)
+
+
+def test_run_cosim():
+    # a bang-bang controller holding V(C1) near 0.5
+    def controller(t, outputs):
+        return [1 if outputs[0] < 0.5 else 0]
+
+    schematic.add_trace("V(C1)")
+    try:
+        steps = schematic.run_cosim(controller, 2, 1e-3, ["V1"], ["VM1"])
+        data = schematic.get_trace_data("V(C1)")
+    finally:
+        schematic.delete_trace("V(C1)")
+
+    assert 1990 < steps < 2010
+    settled = data[data.index > 1]
+    assert np.all(np.abs(settled - 0.5) < 0.01)
+
+
+def test_step_errors(monkeypatch):
+    simulate_step = nl5.NL5_SimulateStep
+    monkeypatch.setattr(nl5, "NL5_SimulateStep", lambda circuit: simulate_step(-1))
+
+    # a failed step is raised at once, even in a batch, instead of stepping on
+    cosim = schematic.cosim(["V1"], ["VM1"])
+    cosim.start(1e-3)
+    with schematic.batch():
+        with pytest.raises(Exception):
+            schematic.simulate_step()
+        with pytest.raises(Exception):
+            cosim.step([1])
+        with pytest.raises(Exception):
+            cosim.run(lambda t, outputs: None, 1)
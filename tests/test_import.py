@@ -0,0 +1,57 @@
+import pytest
+
+import os
+import sys
+import subprocess
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# time "import nl5py" and then the first call into the DLL in a fresh process
+script = """
+import time
+start = time.perf_counter()
+import nl5py
+import nl5py.nl5_dll as nl5_dll
+imported = time.perf_counter()
+loaded_at_import = nl5_dll._nl5_lib is not None
+nl5_dll.load_library()
+loaded = time.perf_counter()
+print(loaded_at_import, imported - start, loaded - imported)
+"""
+
+
+def test_import_does_not_load_library():
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=package_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
+    loaded_at_import, import_time, load_time = output[0], *map(float, output[1:])
+    print(
+        f"import nl5py: {import_time:.3f} s, deferred library load: {load_time:.3f} s"
+    )
+    assert loaded_at_import == "False"
+
+
+def test_library_loaded_on_first_use():
+    from nl5py.nl5_dll import commands
+
+    assert commands.NL5_GetInfo()
+
+
+def test_star_import():
+    # the NL5 functions are bound lazily, but still exported by import *
+    from nl5py.nl5_dll import commands
+
+    namespace = {}
+    exec("from nl5py.nl5_dll.commands import *", namespace)
+    for name in ["NL5_Open", "NL5_GetError", "NL5_SetValue", "load_license"]:
+        assert callable(namespace[name])
+    assert "get_data_arrays" in namespace
+    assert "_bind" not in namespace
+
+    assert "NL5_Open" in dir(commands)
+    assert set(commands.__all__) <= set(dir(commands))
@@ -0,0 +1,108 @@
+import pytest
+from nl5py import Schematic
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+
+SINE = "2*sin(2*pi*t)"
+OFFSET_SINE = "2*sin(2*pi*t)+1"
+DISTORTED_SINE = "sin(2*pi*t)+0.1*sin(6*pi*t)"
+
+# steps from 0 to 1 at t = ln 2, and is stored as only a few samples
+STEP = "V(C1)>0.5"
+
+
+def setup_module():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace(SINE)
+    schematic.add_trace(OFFSET_SINE)
+    schematic.add_trace(DISTORTED_SINE)
+    schematic.add_trace(STEP)
+    schematic.simulate_transient(screen=3, step=1e-3)
+
+
+def test_measure():
+    results = schematic.measure(
+        {
+            "max": (SINE, "max", None),
+            "min": (SINE, "min", None),
+            "pk2pk": (SINE, "pk2pk", (1, 2)),
+            "avg": (OFFSET_SINE, "avg", 1),
+            "rms": (SINE, "rms", 2),
+            "thd": (SINE, "thd", (1, 2), {"frequency": 1}),
+            "distorted": (DISTORTED_SINE, "thd", 2),
+            "len": (SINE, lambda t, v: len(v), (1, 1.5)),
+        }
+    )
+
+    assert results["max"] == pytest.approx(2, abs=1e-4)
+    assert results["min"] == pytest.approx(-2, abs=1e-4)
+    assert results["pk2pk"] == pytest.approx(4, abs=1e-4)
+    assert results["avg"] == pytest.approx(1, abs=1e-3)
+    assert results["rms"] == pytest.approx(np.sqrt(2), abs=1e-3)
+    assert results["thd"] < 1e-3
+    assert results["distorted"] == pytest.approx(0.1, abs=1e-3)
+    assert results["len"] == pytest.approx(501, abs=2)
+
+    with pytest.raises(ValueError):
+        schematic.measure({"x": (SINE, "median", None)})
+
+
+def test_windowed_extraction():
+    data = schematic.get_trace_data(SINE, "numpy")
+    window = schematic.get_trace_data(SINE, "numpy", start=1, end=2)
+    keep = (data[0] >= 1) & (data[0] <= 2)
+    assert np.array_equal(window, data[:, keep])
+
+    assert schematic.get_trace_data(SINE, start=10).empty
+
+
+def test_measure_transient():
+    measurements = {
+        "pk2pk": (SINE, "pk2pk", 1),
+        "rms": (SINE, "rms", 2),
+        "avg": (OFFSET_SINE, "avg", None),
+        "thd": (SINE, "thd", 1, {"frequency": 1}),
+    }
+    streamed = schematic.measure_transient(3, 0.25, 1e-3, measurements)
+
+    schematic.simulate_transient(screen=3, step=1e-3)
+    measured = schematic.measure(measurements)
+    for name in measurements:
+        assert streamed[name] == pytest.approx(measured[name], abs=1e-3)
+
+
+def test_sparse_trace():
+    # the values at the ends of a window are interpolated from the samples
+    # around it, even when there are none inside it
+    measurements = {
+        "high": (STEP, "avg", (1, 1.5)),
+        "avg": (STEP, "avg", (0.5, 1)),
+        "rms": (STEP, "rms", (0.5, 1)),
+        "last": (STEP, "min", 0.5),
+        "low": (STEP, "max", (0.2, 0.6)),
+    }
+    streamed = schematic.measure_transient(3, 0.25, 1e-3, measurements)
+
+    schematic.simulate_transient(screen=3, step=1e-3)
+    assert len(schematic.get_trace_data(STEP)) < 10
+    measured = schematic.measure(measurements)
+
+    expected = {
+        "high": 1,
+        "avg": (1 - np.log(2)) / 0.5,
+        "rms": np.sqrt((1 - np.log(2)) / 0.5),
+        "last": 1,
+        "low": 0,
+    }
+    for name, value in expected.items():
+        assert measured[name] == pytest.approx(value, abs=2e-3)
+        assert streamed[name] == pytest.approx(value, abs=2e-3)
@@ -47,3 +47,40 @@ def test_enable_disable_component():
     # try to disable a non-existance component and verify we throw an exception
     with pytest.raises(Exception):
         schematic.disable_component("C2")
+
+
+def test_parameter_handles():
+    c1 = schematic.param("C1")
+    assert schematic.param("C1") is c1
+
+    c1.value = 2e-9
+    assert c1.value == 2e-9
+    assert schematic.get_value("C1") == 2e-9
+
+    schematic.set_values({"C1": 3e-9, "R1": 5e-3})
+    assert schematic.get_values(["C1", "R1"]) == {"C1": 3e-9, "R1": 5e-3}
+
+    with pytest.raises(Exception, match="C2"):
+        schematic.param("C2")
+
+    with pytest.raises(Exception):
+        schematic.set_values({"C1": 1e-9, "C2": 1e-9})
+
+
+def test_batch():
+    # errors are collected and raised together once the block ends
+    with pytest.raises(Exception) as error:
+        with schematic.batch():
+            schematic.set_value("C100", 1e-9)
+            schematic.set_value("C1", 4e-9)
+            schematic.set_value("R100", 1e-3)
+
+    assert "NL5_SetValue: parameter C100 not found" in str(error.value)
+    assert "NL5_SetValue: parameter R100 not found" in str(error.value)
+    assert schematic.get_value("C1") == 4e-9
+
+    with schematic.batch():
+        schematic.set_value("C1", 1e-9)
+
+    with pytest.raises(Exception, match="parameter C100 not found"):
+        schematic.set_value("C100", 1e-9)
@@ -0,0 +1,194 @@
+import pytest
+from nl5py import Schematic, montecarlo
+from nl5py.sweep import SweepResult
+from nl5py.montecarlo import (
+    sobol,
+    latin_hypercube,
+    unit_samples,
+    norm_ppf,
+    yield_interval,
+    percentile_interval,
+)
+
+import os
+import statistics
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+
+def final_value(data):
+    return data["V(C1)"].iloc[-1]
+
+
+def setup_module():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+
+
+def strata(u, n):
+    return [len(set(np.floor(column * n).astype(int))) for column in u.T]
+
+
+def test_sobol():
+    # every dimension of the first 2^m points has one point per stratum
+    assert strata(sobol(64, 21), 64) == [64] * 21
+
+    # and the first two dimensions have one point in every elementary
+    # interval, which a digital shift preserves
+    for rng in (None, np.random.default_rng(0)):
+        u = sobol(64, 2, rng=rng)
+        for i in range(7):
+            cells = np.floor(u[:, 0] * 2**i) * 2 ** (6 - i) + np.floor(
+                u[:, 1] * 2 ** (6 - i)
+            )
+            assert len(set(cells)) == 64
+
+    # points continue from any start
+    assert np.array_equal(sobol(32, 3, start=32), sobol(64, 3)[32:])
+
+    with pytest.raises(ValueError, match="22"):
+        sobol(8, 22)
+
+
+def test_latin_hypercube():
+    rng = np.random.default_rng(0)
+    assert strata(latin_hypercube(50, 4, rng), 50) == [50] * 4
+
+    # each batch is a Latin hypercube of its own
+    u = unit_samples("lhs", 250, 3, 100, rng)
+    assert strata(u[:100], 100) == [100] * 3
+    assert strata(u[200:], 50) == [50] * 3
+
+    with pytest.raises(ValueError, match="grid"):
+        unit_samples("grid", 10, 1, 10, rng)
+
+
+def test_sampling_efficiency():
+    # the spread of a mean estimated from stratified samples is far smaller
+    # than from the same number of uniform random samples
+    rng = np.random.default_rng(1)
+
+    def estimates(method):
+        return [
+            np.mean(np.exp(unit_samples(method, 100, 2, 100, rng)).prod(axis=1))
+            for _ in range(200)
+        ]
+
+    assert np.std(estimates("lhs")) < np.std(estimates("random")) / 3
+    assert np.std(estimates("sobol")) < np.std(estimates("random")) / 3
+
+
+def test_norm_ppf():
+    p = np.array([1e-9, 1e-4, 0.01, 0.1, 0.5, 0.9, 0.99, 1 - 1e-6])
+    expected = [statistics.NormalDist().inv_cdf(x) for x in p]
+    assert np.allclose(norm_ppf(p), expected, rtol=1e-8)
+
+
+def test_intervals():
+    p, low, high = yield_interval(90, 100, 1.96)
+    assert p == 0.9
+    assert 0.82 < low < 0.83 and 0.94 < high < 0.95
+    assert yield_interval(100, 100, 1.96)[2] == pytest.approx(1)
+
+    values = np.random.default_rng(0).normal(size=10_000)
+    estimate, low, high = percentile_interval(values, 50, 1.96)
+    assert low < estimate < high
+    assert high - low < 0.1
+
+    # too few samples to bound the extreme percentiles
+    assert percentile_interval(values[:10], 1, 1.96)[1] == -np.inf
+
+
+def test_monte_carlo():
+    result = schematic.monte_carlo(
+        {"R1": 0.2, "C1": (0.1, "normal")},
+        ["V(C1)"],
+        screen=1,
+        step=1e-2,
+        metric=final_value,
+        passes=lambda value: value > 0.6,
+        percentiles=(1, 99),
+        samples=2000,
+        batch=100,
+        yield_ci=0.05,
+        workers=2,
+        seed=0,
+    )
+    samples = result.samples
+
+    # stopped well before every sample was simulated
+    assert result.converged
+    assert len(samples) < 2000
+    assert len(samples) % 100 == 0
+    assert samples["error"].isna().all()
+
+    assert (abs(samples["R1"] - 1) <= 0.2).all()
+    assert abs(samples["C1"].mean() - 1) < 0.01
+    assert np.allclose(
+        samples["metric"], 1 - np.exp(-1 / (samples["R1"] * samples["C1"])), atol=1e-2
+    )
+
+    estimate, low, high = result.yield_
+    assert estimate == samples["passed"].mean()
+    assert low < estimate < high and high - low <= 0.1
+
+    percentiles = result.percentiles.loc["metric"]
+    assert percentiles.loc[1, "estimate"] < percentiles.loc[99, "estimate"]
+
+
+def test_monte_carlo_without_targets():
+    result = schematic.monte_carlo(
+        {"R1": 0.1},
+        ["V(C1)"],
+        screen=1,
+        step=1e-2,
+        metric=final_value,
+        samples=32,
+        method="sobol",
+        workers=2,
+    )
+    assert len(result.samples) == 32
+    assert result.yield_ is None
+
+    with pytest.raises(ValueError, match="passes"):
+        schematic.monte_carlo(
+            {"R1": 0.1}, ["V(C1)"], 1, 1e-2, final_value, yield_ci=0.01
+        )
+
+    with pytest.raises(ValueError, match="R3"):
+        schematic.monte_carlo({"R3": 0.1}, ["V(C1)"], 1, 1e-2, final_value)
+
+
+def test_monte_carlo_stops_on_whole_batches(monkeypatch):
+    # results that finish out of order are only counted once every sample
+    # before them has finished, so the run stops on whole batches
+    def run_sweep(schematic, points, traces, screen, step, workers, reduce):
+        order = np.random.default_rng(0).permutation(len(points))
+        for index in order.tolist():
+            yield SweepResult(index, points[index], points[index]["R1"], None)
+
+    monkeypatch.setattr(montecarlo, "run_sweep", run_sweep)
+    result = schematic.monte_carlo(
+        {"R1": 0.2},
+        ["V(C1)"],
+        screen=1,
+        step=1e-2,
+        metric=final_value,
+        passes=lambda value: value > 1,
+        samples=2000,
+        batch=100,
+        yield_ci=0.1,
+        seed=0,
+    )
+    assert result.converged
+    assert list(result.samples.index) == list(range(100))
+
+    # and the batch is still a Latin hypercube
+    u = (result.samples[["R1"]].to_numpy() - 0.8) / 0.4
+    assert strata(u, 100) == [100]
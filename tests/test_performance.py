@@ -0,0 +1,211 @@
+import pytest
+from nl5py import Schematic, SchematicPool, load_data
+
+import os
+import time
+import threading
+import ctypes as ct
+import numpy as np
+from nl5py.nl5_dll import nl5_lib
+from nl5py.nl5_dll.commands import NL5_GetValue, NL5_GetTrace
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+# documented throughput target for bulk trace extraction (samples per second)
+TRACE_EXTRACTION_TARGET = 200_000
+
+# documented target for loading Data traces from NumPy arrays (samples per second)
+DATA_TRACE_LOADING_TARGET = 200_000
+
+# documented co-simulation target, including a trivial controller (steps per second)
+COSIM_STEP_TARGET = 50_000
+
+
+def setup_module():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.simulate_transient(screen=1, step=2e-6)
+
+
+def test_trace_extraction_throughput():
+    start = time.perf_counter()
+    data = schematic.get_trace_data("V(C1)")
+    elapsed = time.perf_counter() - start
+
+    assert len(data) > 400_000
+    assert len(data) / elapsed > TRACE_EXTRACTION_TARGET
+
+
+def test_trace_extraction_matches_per_sample():
+    data = schematic.get_trace_data("V(C1)")
+
+    # spot check the bulk path against the per-sample accessor
+    for n in np.linspace(0, len(data) - 1, 50).astype(int):
+        t, value = schematic.get_data_at("V(C1)", int(n))
+        assert data.index[n] == t
+        assert data.iloc[n] == value
+
+
+def rebinding_get_value(ncir, name, v):
+    # the previous style of wrapper, which re-typed the shared handle per call
+    nl5_lib.NL5_GetValue.argtypes = [ct.c_int, ct.c_char_p, ct.POINTER(ct.c_double)]
+    nl5_lib.NL5_GetValue.restype = ct.c_int
+    return nl5_lib.NL5_GetValue(ncir, name, v)
+
+
+def time_per_call(func, calls=50_000):
+    value = ct.c_double()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(schematic.circuit, b"C1", value)
+    return (time.perf_counter() - start) / calls
+
+
+def test_prebound_call_overhead():
+    rebinding = min(time_per_call(rebinding_get_value) for _ in range(3))
+    prebound = min(time_per_call(NL5_GetValue) for _ in range(3))
+    print(
+        f"per call: rebinding {rebinding * 1e6:.2f} us, prebound {prebound * 1e6:.2f} us"
+    )
+    assert prebound < rebinding
+
+
+def test_memory_mapped_load(tmp_path):
+    path = schematic.export_data(str(tmp_path / "data.nlt"))
+
+    start = time.perf_counter()
+    data = schematic.get_data(["V(C1)"], output="numpy")
+    get_data_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = load_data(path)
+    trace = store["V(C1)"]
+    load_time = time.perf_counter() - start
+
+    print(f"get_data {get_data_time:.3f} s, memory-mapped load {load_time:.6f} s")
+    assert np.array_equal(trace[1], data[1][:, 0])
+    assert load_time < get_data_time / 10
+
+
+def simulate(schematic, _):
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.simulate_transient(screen=1, step=1e-5)
+    return len(schematic.get_trace_data("V(C1)"))
+
+
+def test_pool_concurrency():
+    jobs = 8
+    with SchematicPool(schematic_file, 4) as pool:
+        start = time.perf_counter()
+        with pool.schematic() as copy:
+            serial = [simulate(copy, i) for i in range(jobs)]
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        threaded = list(pool.map(simulate, range(jobs)))
+        threaded_time = time.perf_counter() - start
+
+    print(
+        f"{jobs} simulations on {os.cpu_count()} CPUs: serial {serial_time:.3f} s, "
+        f"4 threads {threaded_time:.3f} s"
+    )
+    assert serial == threaded
+
+
+def test_gil_released():
+    # count in a Python thread while the DLL simulates, which only makes
+    # progress if the GIL is released for the duration of the call
+    count = 0
+    running = threading.Event()
+    stop = threading.Event()
+
+    def counter():
+        nonlocal count
+        running.set()
+        while not stop.is_set():
+            count += 1
+
+    thread = threading.Thread(target=counter)
+    thread.start()
+    running.wait()
+    before = count
+    nl5_time = time.perf_counter()
+    schematic.continue_transient(screen=0.2, step=2e-6)
+    nl5_time = time.perf_counter() - nl5_time
+    during = count - before
+    stop.set()
+    thread.join()
+
+    print(f"{during} Python iterations during a {nl5_time:.3f} s simulation")
+    assert during > 0
+
+
+def test_cosim_step_rate():
+    cosim_file = os.path.join(os.path.dirname(__file__), "cosim.nl5")
+    with Schematic(cosim_file) as cosim_schematic:
+
+        def controller(t, outputs):
+            return [1 if outputs[0] < 0.5 else 0]
+
+        start = time.perf_counter()
+        steps = cosim_schematic.run_cosim(controller, 100, 1e-3, ["V1"], ["VM1"])
+        elapsed = time.perf_counter() - start
+
+    print(f"co-simulation: {steps / elapsed:,.0f} steps/s")
+    assert steps > 99_000
+    assert steps / elapsed > COSIM_STEP_TARGET
+
+
+def test_trace_lookup():
+    # indexed lookups compared to resolving the name through the DLL each time
+    lookups = 100_000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        schematic.get_trace_number("V(C1)")
+    indexed = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    for _ in range(lookups):
+        NL5_GetTrace(schematic.circuit, b"V(C1)")
+    direct = (time.perf_counter() - start) / lookups
+
+    print(f"trace lookup: indexed {indexed * 1e6:.2f} us, DLL {direct * 1e6:.2f} us")
+    assert indexed < direct
+
+
+def test_trace_setup():
+    # set up and tear down a large set of traces, as between sweep points
+    names = [f"V(C1)*{i}" for i in range(300)]
+    with Schematic(schematic_file) as other:
+        start = time.perf_counter()
+        other.add_traces(names)
+        added = time.perf_counter() - start
+        assert other.get_trace_names() == names
+
+        start = time.perf_counter()
+        other.clear_traces()
+        cleared = time.perf_counter() - start
+        assert other.get_trace_names() == []
+
+    print(
+        f"300 traces: added in {added * 1e3:.2f} ms, cleared in {cleared * 1e3:.2f} ms"
+    )
+
+
+def test_data_trace_loading():
+    t = np.linspace(0, 1, 200_001)
+    values = np.sin(2 * np.pi * 50 * t)
+    with Schematic(schematic_file) as other:
+        start = time.perf_counter()
+        other.load_data_trace("stimulus", t, values)
+        elapsed = time.perf_counter() - start
+
+    print(f"data trace loading: {len(t) / elapsed:,.0f} samples/s")
+    assert len(t) / elapsed > DATA_TRACE_LOADING_TARGET
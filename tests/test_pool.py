@@ -0,0 +1,118 @@
+import pytest
+from nl5py import Schematic, SchematicPool
+
+import os
+import gc
+import queue
+import threading
+from nl5py.nl5_dll import commands
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+
+
+def final_value(schematic, r):
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.set_value("R1", r)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.simulate_transient(screen=1, step=1e-3)
+    return schematic.get_trace_data("V(C1)").iloc[-1]
+
+
+def test_pool():
+    with SchematicPool(schematic_file, 3) as pool:
+        assert len(pool) == 3
+        circuits = {schematic.circuit for schematic in pool._schematics}
+        assert len(circuits) == 3
+
+        results = list(pool.map(final_value, [1, 2, 0.5, 1, 2, 0.5]))
+        assert 0.631 < results[0] < 0.634
+        assert results[1] < results[0] < results[2]
+        assert results[:3] == results[3:]
+
+        # every copy is lent out, so another one can't be borrowed
+        with pool.schematic(), pool.schematic(), pool.schematic():
+            with pytest.raises(queue.Empty):
+                with pool.schematic(timeout=0.01):
+                    pass
+
+    assert len(pool) == 0
+
+
+def test_pool_errors():
+    def set_missing(schematic, name):
+        schematic.set_value(name, 1)
+
+    with SchematicPool(schematic_file, 2) as pool:
+        with pytest.raises(Exception, match="C2"):
+            list(pool.map(set_missing, ["R1", "C2"]))
+
+
+def test_close():
+    schematic = Schematic(schematic_file)
+    schematic.close()
+    assert schematic.circuit is None
+
+    # closing twice is harmless
+    schematic.close()
+
+    with Schematic(schematic_file) as schematic:
+        schematic.get_value("R1")
+    assert schematic.circuit is None
+
+
+def test_concurrent_errors():
+    # each thread fails on its own missing component, and must only ever see
+    # its own error message, even though the DLL has one error register
+    def fail(schematic, name):
+        wrong = 0
+        for _ in range(20_000):
+            try:
+                schematic.set_value(name, 1)
+            except Exception as error:
+                if name not in str(error):
+                    wrong += 1
+        return wrong
+
+    with SchematicPool(schematic_file, 2) as pool:
+        assert list(pool.map(fail, ["C2", "R7"])) == [0, 0]
+
+
+def test_extraction_lock(monkeypatch):
+    # a bulk extraction only takes the lock to read the error of a failing call
+    get_data_at = commands._function("_NL5_GetDataAt_raw")
+    locked = []
+
+    def record(ncir, ntrace, n, t, data):
+        locked.append(commands._error_lock.locked())
+        return -1 if n == fail else get_data_at(ncir, ntrace, n, t, data)
+
+    monkeypatch.setattr(commands, "_NL5_GetDataAt_raw", record)
+    with Schematic(schematic_file) as schematic:
+        fail = None
+        final_value(schematic, 1)
+        assert len(locked) > 1000 and not any(locked)
+
+        locked.clear()
+        fail = 5
+        with pytest.raises(Exception):
+            schematic.get_trace_data("V(C1)")
+        assert locked == [False] * 6 + [True]
+
+
+def test_collected_inside_lock():
+    # the garbage collector can close a schematic while this thread holds the
+    # lock, which must not wait for itself
+    def collect():
+        schematic = Schematic(schematic_file)
+        schematic.get_trace_names()
+        del schematic
+        with commands._error_lock:
+            gc.collect()
+
+    thread = threading.Thread(target=collect, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
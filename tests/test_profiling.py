@@ -0,0 +1,92 @@
+import pytest
+from nl5py import Schematic, Profiler
+
+import os
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+
+def setup_module():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_traces(["V(C1)", "V(C1)*2"])
+
+
+def test_profiler():
+    profiler = schematic.profiler = Profiler()
+    try:
+        schematic.simulate_transient(screen=1, step=1e-4)
+        data = schematic.get_data()
+    finally:
+        schematic.profiler = None
+
+    stats = profiler.to_dict()
+    methods = stats["methods"]
+    assert methods["simulate_transient"]["calls"] == 1
+    assert methods["get_data"]["calls"] == 1
+    assert methods["get_trace_data"]["calls"] == 2
+
+    simulate = methods["simulate_transient"]
+    assert 0 < simulate["solver_time"] <= simulate["time"]
+    assert simulate["extract_time"] == 0
+
+    get_data = methods["get_data"]
+    assert 0 < get_data["extract_time"] <= get_data["time"]
+    assert get_data["python_time"] == pytest.approx(
+        get_data["time"] - get_data["extract_time"]
+    )
+    assert stats["bytes_extracted"] == 2 * 16 * len(data)
+
+    # get_trace_data runs inside get_data, and its extraction inside it
+    spans = {span["name"]: span for span in profiler.spans()}
+    assert spans["get_trace_data"]["parent_span_id"] == spans["get_data"]["span_id"]
+    assert (
+        spans["get_data_arrays"]["parent_span_id"]
+        == spans["get_trace_data"]["span_id"]
+    )
+    assert spans["get_data_arrays"]["attributes"] == {
+        "nl5py.kind": "extract",
+        "bytes": 16 * len(data),
+    }
+    assert spans["get_data"]["parent_span_id"] is None
+    for span in spans.values():
+        assert span["start_time_unix_nano"] <= span["end_time_unix_nano"]
+
+    # nothing is recorded once it is detached
+    schematic.get_data()
+    assert profiler.to_dict()["methods"]["get_data"]["calls"] == 1
+
+    profiler.reset()
+    assert profiler.to_dict() == {"methods": {}, "bytes_extracted": 0}
+
+
+def test_checkpoint_profiled():
+    profiler = schematic.profiler = Profiler()
+    try:
+        schematic.simulate_transient(screen=1, step=1e-3)
+        schematic.checkpoint()
+    finally:
+        schematic.profiler = None
+        schematic.set_value("C1.IC", 0)
+
+    assert profiler.to_dict()["methods"]["checkpoint"]["calls"] == 1
+
+
+def test_on_progress():
+    updates = []
+    schematic.on_progress = lambda t, screen: updates.append((t, screen))
+    schematic.progress_interval = 0.01
+    try:
+        schematic.simulate_transient(screen=1, step=2e-6)
+    finally:
+        schematic.on_progress = None
+
+    times = [t for t, _ in updates]
+    assert len(updates) > 1
+    assert times == sorted(times)
+    assert times[-1] == pytest.approx(1, abs=1e-3)
+    assert all(screen == 1 for _, screen in updates)
@@ -0,0 +1,91 @@
+import pytest
+from nl5py import read_schematic
+
+import os
+import sys
+import time
+import subprocess
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+schematic_file = os.path.join(tests_dir, "rc.nl5")
+
+
+def test_read_schematic():
+    index = read_schematic(schematic_file)
+    assert sorted(index.components) == ["C1", "R1", "V1"]
+    assert len(index) == 3
+
+    c1 = index["c1"]
+    assert (c1.name, c1.type, c1.model) == ("C1", "C_C", "C")
+    assert c1.nodes == ["0", "1"]
+    assert c1.properties == {"model": "C", "c": "1e-9", "ic": ""}
+
+    assert "C1" in index and "r1" in index and "C2" not in index
+    assert index.nodes == {"0": ["C1", "V1"], "1": ["C1", "R1"], "2": ["R1", "V1"]}
+    assert "C1.IC" in index.parameters()
+    assert [component.name for component in index.find(type="R_R")] == ["R1"]
+    assert index.traces == [] and index.ac_traces == []
+    assert index.subcircuits == {}
+
+
+def test_validate():
+    index = read_schematic(schematic_file)
+    index.validate(["C1", "r1.R", "V1.Phase"])
+
+    with pytest.raises(ValueError, match="C2, X1.Cmd not found"):
+        index.validate(["C1", "C2", "X1.Cmd"])
+
+
+def test_traces(tmp_path):
+    from nl5py import Schematic
+
+    schematic = Schematic(schematic_file)
+    schematic.add_traces(["V(C1)", "V(C1)+V(R1)"])
+    schematic.add_ac_trace("C1", "V")
+    filename = str(tmp_path / "traces.nl5")
+    schematic.saveas(filename)
+    schematic.close()
+
+    index = read_schematic(filename)
+    assert index.traces == ["V(C1)", "V(C1)+V(R1)"]
+    assert index.ac_traces == ["V(C1)"]
+
+
+def test_large_schematic(tmp_path):
+    # a chain of thousands of resistors
+    components = "\n".join(
+        f'<Cmp type="R_R" id="{i}" name="R{i}" descr="" view="0" '
+        f'node0="{i}" node1="{i + 1}" model="R" r="1" />'
+        for i in range(10_000)
+    )
+    filename = tmp_path / "large.nl5"
+    filename.write_text(
+        f'<?xml version="1.0"?>\n<NL5><Doc><Cir><Cmps>\n{components}\n'
+        "</Cmps></Cir></Doc></NL5>\n"
+    )
+
+    start = time.perf_counter()
+    index = read_schematic(str(filename))
+    elapsed = time.perf_counter() - start
+
+    print(f"indexed {len(index)} components in {elapsed * 1e3:.1f} ms")
+    assert len(index) == 10_000
+    assert index["R9999"].nodes == ["9999", "10000"]
+    assert elapsed < 1
+
+
+def test_read_without_library():
+    script = (
+        "import nl5py, nl5py.nl5_dll as nl5_dll\n"
+        f"index = nl5py.read_schematic({schematic_file!r})\n"
+        "index.validate(['C1'])\n"
+        "print(nl5_dll._nl5_lib is None)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(tests_dir),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "True"
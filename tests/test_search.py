@@ -0,0 +1,151 @@
+import pytest
+from nl5py import Schematic
+from nl5py.search import brent, bisect
+
+import os
+import numpy as np
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+# V(C1) at t = 1 is 1 - exp(-1 / RC), which is 0.5 where RC = 1 / ln 2
+BOUNDARY = 1 / np.log(2)
+
+
+def margin(data):
+    return data["V(C1)"].iloc[-1] - 0.5
+
+
+def setup_module():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+
+
+def test_brent():
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return np.cos(x)
+
+    (x, other), converged = brent(f, 0, 3, 1e-10, 50)
+    assert converged
+    assert abs(x - np.pi / 2) < 1e-10
+    assert np.cos(x) * np.cos(other) <= 0
+    assert len(calls) < 12
+
+    # a step is found in about as many calls as by bisection
+    def step(x):
+        calls.append(x)
+        return 1 if x < 1.2345 else -1
+
+    calls = []
+    (x, other), converged = brent(step, 0, 3, 1e-6, 50)
+    assert converged and abs(x - 1.2345) < 1e-6
+    brent_calls = len(calls)
+
+    calls = []
+    (a, b), converged = bisect(step, 0, 3, 1e-6, 50)
+    assert converged and a < 1.2345 < b
+    assert brent_calls <= len(calls) + 2
+
+
+def test_find_boundary():
+    result = schematic.find_boundary(
+        "R1", 0.5, 5, ["V(C1)"], screen=1, step=1e-3, metric=margin, xtol=1e-4
+    )
+    passing, failing = result.bracket
+    assert result.converged
+    assert result.value == passing
+    assert abs(passing - failing) < 1e-4
+    assert abs(result.value - BOUNDARY) < 2e-3
+
+    # the margin passes below the boundary and fails above it
+    assert result.evaluations[passing] >= 0 > result.evaluations[failing]
+    assert len(result.evaluations) < 15
+
+    # the schematic is left as it was
+    assert schematic.get_value("R1") == 1
+
+    # bisection takes more simulations for the same bracket
+    bisected = schematic.find_boundary(
+        "R1", 0.5, 5, ["V(C1)"], 1, 1e-3, margin, xtol=1e-4, method="bisect"
+    )
+    assert abs(bisected.value - result.value) < 1e-4
+    assert len(bisected.evaluations) > len(result.evaluations)
+
+
+def test_find_boundary_reuse():
+    evaluations = {}
+    coarse = schematic.find_boundary(
+        "R1", 0.5, 5, ["V(C1)"], 1, 1e-3, margin, xtol=0.1, evaluations=evaluations
+    )
+    simulated = len(evaluations)
+
+    # a finer search starts from the bracket found by the first
+    fine = schematic.find_boundary(
+        "R1", 0.5, 5, ["V(C1)"], 1, 1e-3, margin, xtol=1e-4, evaluations=evaluations
+    )
+    assert fine.evaluations is evaluations
+    assert coarse.bracket[0] <= fine.value <= coarse.bracket[1]
+    assert len(evaluations) - simulated < 10
+
+
+def test_find_boundary_errors():
+    with pytest.raises(ValueError, match="passes at both"):
+        schematic.find_boundary("R1", 0.1, 1, ["V(C1)"], 1, 1e-3, margin)
+    with pytest.raises(ValueError, match="R3"):
+        schematic.find_boundary("R3", 0.1, 1, ["V(C1)"], 1, 1e-3, margin)
+    with pytest.raises(ValueError, match="R3"):
+        schematic.map_boundary({"R3": (0.1, 1)}, ["V(C1)"], 1, 1e-3, margin)
+
+    # without the index, the missing component is only found by NL5
+    with pytest.raises(Exception, match="R3") as error:
+        schematic.find_boundary(
+            "R3", 0.1, 1, ["V(C1)"], 1, 1e-3, margin, validate=False
+        )
+    assert error.type is not ValueError
+    with pytest.raises(Exception, match="R3") as error:
+        schematic.map_boundary(
+            {"R3": (0.1, 1)}, ["V(C1)"], 1, 1e-3, margin, validate=False
+        )
+    assert error.type is not ValueError
+    with pytest.raises(ValueError, match="secant"):
+        schematic.find_boundary(
+            "R1", 0.5, 5, ["V(C1)"], 1, 1e-3, margin, method="secant"
+        )
+    assert schematic.get_value("R1") == 1
+
+
+def test_map_boundary():
+    ranges = {"R1": (0.5, 3), "C1": (0.5, 3)}
+    evaluations = {}
+    result = schematic.map_boundary(
+        ranges, ["V(C1)"], 1, 1e-2, margin, points=5, levels=3, evaluations=evaluations
+    )
+    samples, boundary = result
+
+    # far fewer points than the full 33 x 33 grid
+    assert len(samples) == len(evaluations) < 33 * 33 / 3
+    assert set(samples["passed"]) == {True, False}
+
+    # the boundary is where RC = 1 / ln 2, to within a step of the grid in
+    # either parameter, and the error of the coarse simulation step
+    assert len(boundary) > 10
+    rc = boundary["R1"] * boundary["C1"]
+    assert (rc < BOUNDARY + 0.01).all()
+    assert (rc > BOUNDARY - 0.25).all()
+    assert schematic.get_values(["R1", "C1"]) == {"R1": 1, "C1": 1}
+
+    # refining further only simulates the points that are new
+    simulated = set(evaluations)
+    finer = schematic.map_boundary(
+        ranges, ["V(C1)"], 1, 1e-2, margin, points=5, levels=4, evaluations=evaluations
+    )
+    assert len(finer.samples) == len(evaluations)
+    assert simulated < set(evaluations)
+    assert len(finer.boundary) > len(boundary)
@@ -0,0 +1,90 @@
+import pytest
+from nl5py import Schematic
+
+import os
+
+schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
+schematic = Schematic(schematic_file)
+
+
+def final_value(data):
+    return data["V(C1)"].iloc[-1]
+
+
+def test_sweep():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("C1.IC", 0)
+
+    # the last point references a missing property and must fail on its own
+    grid = [{"R1": 1}, {"R1": 2}, {"R1": 0.5}, {"C1.X": 1}]
+    results = list(
+        schematic.sweep(
+            grid, ["V(C1)"], screen=1, step=1e-3, workers=2, reduce=final_value
+        )
+    )
+    assert len(results) == 4
+
+    results = {result.index: result for result in results}
+    assert 0.631 < results[0].result < 0.634
+    assert results[1].result < results[0].result < results[2].result
+    assert results[3].result is None
+    assert "C1.X" in str(results[3].error)
+
+
+def test_sweep_validation():
+    # missing components are found in the file before any worker starts
+    with pytest.raises(ValueError, match="C2, R3 not found"):
+        schematic.sweep([{"R1": 1}, {"C2": 1, "R3": 1}], ["V(C1)"], screen=1, step=1e-3)
+
+    with pytest.raises(ValueError, match="C3"):
+        schematic.sweep({"C3.IC": [0, 1]}, ["V(C1)"], screen=1, step=1e-3)
+
+
+def test_sweep_from_checkpoint():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.simulate_transient(screen=1, step=1e-3)
+    schematic.restore(schematic.checkpoint())
+
+    # every point starts from the checkpoint, not from zero
+    grid = {"V1": [0, 1]}
+    results = list(
+        schematic.sweep(grid, ["V(C1)"], screen=0.1, step=1e-3, reduce=final_value)
+    )
+    results = {result.index: result.result for result in results}
+    assert 0.56 < results[0] < 0.58
+    assert 0.66 < results[1] < 0.67
+
+    schematic.set_value("C1.IC", 0)
+
+
+def test_sweep_points_are_independent():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+
+    # one worker runs every point in turn, and a point that leaves out a name,
+    # or follows one that failed after setting R1, still starts from R1 = 1
+    grid = [{"R1": 2}, {"C1": 2}, {"R1": 3, "C1.X": 1}, {"C1": 2}, {"R1": 2}]
+    results = list(
+        schematic.sweep(
+            grid,
+            ["V(C1)"],
+            screen=1,
+            step=1e-3,
+            workers=1,
+            reduce=final_value,
+            validate=False,
+        )
+    )
+    results = {result.index: result for result in results}
+    assert results[2].error is not None
+    assert 0.39 < results[0].result < 0.40
+    assert results[1].result == results[3].result == results[0].result
+    assert results[4].result == results[0].result
@@ -1,8 +1,11 @@
 import pytest
-from nl5py import Schematic
+from nl5py import Schematic, SchematicIndex, ResultCache, load_data
+from nl5py.nl5_dll import commands as nl5
 
 import pytest
 import os
+import pandas as pd
+import numpy as np
 
 schematic_file = os.path.join(os.path.dirname(__file__), "rc.nl5")
 schematic = Schematic(schematic_file)
@@ -29,6 +32,64 @@ def test_add_remove_traces():
     assert not traces
 
 
+def test_add_traces():
+    schematic.clear_traces()
+    schematic.add_traces(["C1", "R1"], "V")
+    schematic.add_traces(["V(C1)*2", "V(C1)*3"])
+    assert schematic.get_trace_names() == ["V(C1)", "V(R1)", "V(C1)*2", "V(C1)*3"]
+
+    # the valid traces are still added, and every error is reported at the end
+    with pytest.raises(Exception) as error:
+        schematic.add_traces(["C1", "C2", "R1", "R2"], "I")
+    assert "C2" in str(error.value) and "R2" in str(error.value)
+    assert schematic.get_trace_names()[-2:] == ["I(C1)", "I(R1)"]
+
+    schematic.clear_traces()
+    assert schematic.get_trace_names() == []
+
+
+def test_trace_index():
+    schematic.clear_traces()
+
+    # names longer than the initial name buffer are read in full
+    long_trace = "+".join(["V(C1)"] * 30)
+    schematic.add_trace(long_trace)
+    schematic.add_trace("C1", "V")
+    assert schematic.get_trace_names() == [long_trace, "V(C1)"]
+
+    # length is only where the name buffer starts
+    schematic._traces.invalidate()
+    assert schematic.get_trace_names(length=4) == [long_trace, "V(C1)"]
+
+    # handles don't change as other traces are deleted
+    handle = schematic.get_trace_number("V(C1)")
+    schematic.delete_trace(long_trace)
+    assert schematic.get_trace_names() == ["V(C1)"]
+    assert schematic.get_trace_number("V(C1)") == handle
+
+    # names are matched regardless of case, as in NL5, without reloading
+    names = schematic._traces._names
+    assert schematic.get_trace_number("v(c1)") == handle
+    assert schematic._traces._names is names
+    assert "v(C1)" in schematic._traces
+
+    # traces added directly through the DLL are still found
+    nl5.NL5_AddFuncTrace(schematic.circuit, b"V(C1)*3")
+    assert schematic.get_trace_number("V(C1)*3") >= 0
+    assert schematic.get_trace_names() == ["V(C1)", "V(C1)*3"]
+
+    with pytest.raises(Exception, match="not found"):
+        schematic.get_trace_number("V(C2)")
+
+    # a trace that isn't found is raised even in a batch, since nothing can
+    # be done without its handle
+    with schematic.batch():
+        with pytest.raises(Exception, match="not found"):
+            schematic.get_trace_data("V(C2)")
+
+    schematic.clear_traces()
+
+
 def test_simulation():
     schematic.set_value("V1", 1)
     schematic.set_value("C1", 1)
@@ -41,3 +102,193 @@ def test_simulation():
     assert data["V(C1)"].iloc[0] < 0.1
     assert data["V(C1)"].iloc[-1] < 0.634
     assert data["V(C1)"].iloc[-1] > 0.631
+
+
+def test_stream_transient():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+
+    chunks = []
+    for chunk in schematic.stream_transient(total=1, chunk=0.1, step=1e-3):
+        # only a single chunk of data is ever held by the DLL
+        assert len(chunk) <= 103
+        assert len(schematic.get_trace_data("V(C1)")) == 1
+        chunks.append(chunk)
+
+    assert len(chunks) == 10
+    data = pd.concat(chunks)
+    assert data.index.is_monotonic_increasing
+    assert data.index.is_unique
+    assert data["V(C1)"].iloc[0] < 0.1
+    assert data["V(C1)"].iloc[-1] < 0.634
+    assert data["V(C1)"].iloc[-1] > 0.631
+
+
+def test_resampled_data():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.add_trace("V(C1)*2")
+    schematic.simulate_transient(screen=1, step=1e-3)
+
+    data = schematic.get_data(uniform_step=0.01)
+    assert len(data) == 101
+    assert np.allclose(np.diff(data.index), 0.01)
+    assert np.allclose(data["V(C1)"], 1 - np.exp(-data.index), atol=1e-3)
+    assert np.allclose(data["V(C1)*2"], 2 * data["V(C1)"])
+
+    times = np.array([0.25, 0.5, 0.75])
+    data = schematic.get_data(["V(C1)"], times=times)
+    assert list(data.index) == list(times)
+    assert np.allclose(data["V(C1)"], 1 - np.exp(-times), atol=1e-3)
+
+
+def test_numpy_output():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.add_trace("V(C1)*2")
+    schematic.simulate_transient(screen=1, step=1e-3)
+
+    data = schematic.get_data()
+    t, values = schematic.get_data(output="numpy")
+    assert np.array_equal(t, data.index)
+    assert np.array_equal(values, data.values)
+
+    structured = schematic.get_data(output="structured")
+    assert np.array_equal(structured["time"], t)
+    assert np.array_equal(structured["V(C1)*2"], values[:, 1])
+
+    trace = schematic.get_trace_data("V(C1)", output="numpy")
+    assert trace.shape == (2, len(t))
+    assert np.array_equal(trace[1], values[:, 0])
+
+    trace = schematic.get_trace_data("V(C1)", output="structured")
+    assert np.array_equal(trace["time"], t)
+    assert np.array_equal(trace["value"], values[:, 0])
+
+    with pytest.raises(ValueError):
+        schematic.get_data(output="polars")
+
+    # a trace added after simulating has no data yet
+    schematic.add_trace("V(R1)")
+    assert len(schematic.get_trace_data("V(R1)")) == 0
+
+
+@pytest.mark.parametrize("format", ["nl5", "npy"])
+def test_export_data(tmp_path, format):
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.add_trace("V(C1)*2")
+    schematic.simulate_transient(screen=1, step=1e-3)
+
+    path = str(tmp_path / "data")
+    store = load_data(schematic.export_data(path, format=format))
+    assert store.names == ["V(C1)", "V(C1)*2"]
+
+    data = schematic.get_data()
+    assert np.array_equal(store["V(C1)"][0], data.index)
+    assert np.array_equal(store["V(C1)*2"][1], data["V(C1)*2"])
+    assert store.get_data().equals(data)
+
+
+def test_checkpoint():
+    schematic.set_value("V1", 1)
+    schematic.set_value("C1", 1)
+    schematic.set_value("R1", 1)
+    schematic.set_value("C1.IC", 0)
+    schematic.clear_traces()
+    schematic.add_trace("V(C1)")
+    schematic.simulate_transient(screen=1, step=1e-3)
+    checkpoint = schematic.checkpoint()
+    assert checkpoint.time == pytest.approx(1, abs=1e-3)
+    assert float(checkpoint.ics["C1.IC"]) == pytest.approx(0.632, abs=1e-3)
+
+    # continue without the checkpoint as a reference
+    schematic.set_value("R1", 2)
+    schematic.continue_transient(screen=0.5, step=1e-3)
+    reference = schematic.get_last_data("V(C1)")[1]
+
+    # start over from an unrelated state, then branch from the checkpoint
+    schematic.set_value("C1.IC", 0)
+    schematic.simulate_transient(screen=0.5, step=1e-3)
+    schematic.restore(checkpoint)
+    schematic.simulate_transient(screen=0.5, step=1e-3)
+    data = schematic.get_trace_data("V(C1)")
+    assert data.iloc[0] == pytest.approx(0.632, abs=1e-3)
+    assert data.iloc[-1] == pytest.approx(reference, abs=1e-3)
+
+    assert schematic._changes[("parameter", "C1.IC")] == (
+        "set_text",
+        ("C1.IC", checkpoint.ics["C1.IC"]),
+    )
+    schematic.set_value("C1.IC", 0)
+
+
+def test_checkpoint_subcircuits(monkeypatch):
+    # the state inside subcircuits can't be read back into the checkpoint
+    monkeypatch.setattr(
+        SchematicIndex, "subcircuits", property(lambda index: {"X1": None})
+    )
+    schematic.simulate_transient(screen=0.1, step=1e-3)
+    with pytest.warns(UserWarning, match="X1"):
+        schematic.checkpoint()
+    schematic.set_value("C1.IC", 0)
+
+
+def test_load_data_trace():
+    schematic.clear_traces()
+    t = np.linspace(0, 1, 1001)
+    schematic.load_data_trace("stimulus", t, np.sin(t))
+    assert schematic.get_trace_names() == ["stimulus"]
+
+    # loading it again replaces the data of the same trace
+    handle = schematic.get_trace_number("stimulus")
+    schematic.load_data_trace("stimulus", t, np.cos(t))
+    assert schematic.get_trace_names() == ["stimulus"]
+    assert schematic.get_trace_number("stimulus") == handle
+
+    with pytest.raises(ValueError):
+        schematic.load_data_trace("stimulus", t, np.cos(t[:-1]))
+
+    schematic.clear_traces()
+
+
+def test_data_trace_is_recorded(tmp_path):
+    with Schematic(schematic_file, cache=ResultCache(str(tmp_path))) as other:
+        t = np.linspace(0, 1, 10_001)
+        values = np.sin(t)
+        other.load_data_trace("stimulus", t, values)
+        key = other._cache_key("transient", 1, 1e-3)
+
+        # a change in the middle of a long stimulus still changes the key
+        values[5000] += 1
+        other.load_data_trace("stimulus", t, values)
+        assert other._cache_key("transient", 1, 1e-3) != key
+
+        # and the samples are replayed, as in sweep workers
+        with Schematic(schematic_file) as replayed:
+            replayed._replay(other._changes.values())
+            assert replayed.get_trace_names() == ["stimulus"]
+            saved = str(tmp_path / "replayed.nl5")
+            replayed.saveas(saved)
+            with open(saved) as f:
+                assert 'expr="stimulus"' in f.read().split('type="Data"')[0]
+
+        # the record goes with the trace
+        other.clear_traces()
+        assert not other._changes